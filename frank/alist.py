@@ -5,26 +5,32 @@ Description: Alist class and functions
 
 '''
 
+import json
 from copy import deepcopy
 
 
 class Alist:
 
+    # fixed instance layout; the alist's data lives in the JSON-compatible
+    # `attributes` dict, which is also the node storage of the graph
+    __slots__ = ('attributes', 'children', 'parent', 'nodes_to_enqueue_only',
+                 'nodes_to_enqueue_and_process', 'parent_decomposition')
+
     def __init__(self, **kwargs):
         self.attributes = {
-            Attributes.ID: kwargs[Attributes.ID] if Attributes.ID in kwargs else "0",
-            Attributes.OP: kwargs[Attributes.OP] if Attributes.OP in kwargs else 'value',
-            Attributes.SUBJECT: kwargs[Attributes.SUBJECT] if Attributes.SUBJECT in kwargs else '',
-            Attributes.PROPERTY: kwargs[Attributes.PROPERTY] if Attributes.PROPERTY in kwargs else '',
-            Attributes.OBJECT: kwargs[Attributes.OBJECT] if Attributes.OBJECT in kwargs else '',
-            Attributes.OPVAR: kwargs[Attributes.OPVAR] if Attributes.OPVAR in kwargs else '',
-            Attributes.COV: kwargs[Attributes.COV] if Attributes.COV in kwargs else 0.0,
-            Attributes.TIME: kwargs[Attributes.TIME] if Attributes.TIME in kwargs else '',
-            Attributes.EXPLAIN: kwargs[Attributes.EXPLAIN] if Attributes.EXPLAIN in kwargs else '',
-            Attributes.FNPLOT: kwargs[Attributes.FNPLOT] if Attributes.FNPLOT in kwargs else '',
-            Attributes.CONTEXT: kwargs[Attributes.CONTEXT] if Attributes.CONTEXT in kwargs else '',
+            Attributes.ID: kwargs.get(Attributes.ID, "0"),
+            Attributes.OP: kwargs.get(Attributes.OP, 'value'),
+            Attributes.SUBJECT: kwargs.get(Attributes.SUBJECT, ''),
+            Attributes.PROPERTY: kwargs.get(Attributes.PROPERTY, ''),
+            Attributes.OBJECT: kwargs.get(Attributes.OBJECT, ''),
+            Attributes.OPVAR: kwargs.get(Attributes.OPVAR, ''),
+            Attributes.COV: kwargs.get(Attributes.COV, 0.0),
+            Attributes.TIME: kwargs.get(Attributes.TIME, ''),
+            Attributes.EXPLAIN: kwargs.get(Attributes.EXPLAIN, ''),
+            Attributes.FNPLOT: kwargs.get(Attributes.FNPLOT, ''),
+            Attributes.CONTEXT: kwargs.get(Attributes.CONTEXT, ''),
             'meta': {
-                'cost': kwargs[Attributes.COST] if Attributes.COST in kwargs else 0.0,
+                'cost': kwargs.get(Attributes.COST, 0.0),
                 'depth': 0,
                 'state': States.UNEXPLORED,
                 'data_sources': [],
@@ -33,19 +39,9 @@ class Alist:
             }
         }
 
-        for k in set(kwargs) - {Attributes.OP, Attributes.SUBJECT, Attributes.PROPERTY, Attributes.OBJECT,
-                                Attributes.OPVAR, Attributes.COV, Attributes.TIME, Attributes.EXPLAIN,
-                                Attributes.FNPLOT, Attributes.CONTEXT}:
+        for k in kwargs.keys() - _FIXED_ATTRIBUTES:
             self.attributes[k] = kwargs[k]
 
-        # self.id = kwargs[Attributes.ID] if Attributes.ID in kwargs else "0"
-        # self.cost = kwargs[Attributes.COST] if Attributes.COST in kwargs else 0.0
-        # self.depth = 0
-        # self.state = States.UNEXPLORED
-        # self.data_sources = set()
-        # self.branch_type = Branching.OR
-        # self.node_type = NodeTypes.ZNODE
-
         self.children = []
         self.parent = []
         # these are for set comprehension operations when a node spawns new nodes after reducing
@@ -53,6 +49,21 @@ class Alist:
         self.nodes_to_enqueue_and_process = []
         self.parent_decomposition = ''
 
+    @classmethod
+    def view(cls, attributes):
+        """ 
+        Create an alist over an existing attributes dict without copying it.
+        Changes made through the alist are made to the dict in place.
+        """
+        alist = cls.__new__(cls)
+        alist.attributes = attributes
+        alist.children = []
+        alist.parent = []
+        alist.nodes_to_enqueue_only = []
+        alist.nodes_to_enqueue_and_process = []
+        alist.parent_decomposition = ''
+        return alist
+
     @property
     def id(self):
         return self.attributes[Attributes.ID]
@@ -136,20 +147,27 @@ class Alist:
     #     child.parent.append(self)
 
     def copy(self):
-        """ create a copy of the alist"""
-        new_alist_attrs = deepcopy(self.attributes)
-        new_alist = Alist(**new_alist_attrs)
-        new_alist.id = "0"
-        new_alist.cost = 0
-        new_alist.depth = 0
-        new_alist.state = States.UNEXPLORED
-        new_alist.nodes_to_enqueue_only = []
-        new_alist.nodes_to_enqueue_and_process = []
-        new_alist.data_sources = deepcopy(self.data_sources)
-        return new_alist
+        """ 
+        Create a copy of the alist. 
+        Scalar values and the context are shared with the original since
+        they are never modified in place; only nested containers are copied.
+        """
+        new_alist_attrs = {}
+        for k, v in self.attributes.items():
+            if k == Attributes.CONTEXT or not isinstance(v, (dict, list, set)):
+                new_alist_attrs[k] = v
+            else:
+                new_alist_attrs[k] = deepcopy(v)
+        meta = new_alist_attrs['meta']
+        meta['cost'] = 0
+        meta['depth'] = 0
+        meta['state'] = States.UNEXPLORED
+        new_alist_attrs[Attributes.ID] = "0"
+        return Alist.view(new_alist_attrs)
 
     def get_alist_json_with_metadata(self):
-        alist = deepcopy(self.attributes)
+        alist = dict(self.attributes)
+        alist['meta'] = dict(alist['meta'])
         alist[Attributes.ID] = self.id
         return alist
 
@@ -274,6 +292,30 @@ class Alist:
                    }
         return olattrs
 
+    def signature(self):
+        """
+        Returns a canonical key for the sub-goal that the alist represents.
+        Alists with the same operation, instantiated subject, property, 
+        object and time, and the same context have the same signature. 
+        Uninstantiated attributes are keyed by their role rather than 
+        the variable name, so renamed variables still match.
+        """
+        opvar = self.get(Attributes.OPVAR)
+        parts = [str(self.get(Attributes.OP)).lower()]
+        for attr in [Attributes.SUBJECT, Attributes.PROPERTY, Attributes.OBJECT, Attributes.TIME]:
+            if self.is_instantiated(attr):
+                parts.append(str(self.instantiation_value(attr)))
+            elif self.get(attr) == opvar:
+                parts.append(Attributes.OPVAR)
+            elif isinstance(self.instantiation_value(attr), dict):
+                parts.append(json.dumps(self.instantiation_value(attr),
+                                        sort_keys=True, default=str))
+            else:
+                parts.append(str(self.get(attr))[:1])
+        parts.append(json.dumps(self.get(Attributes.CONTEXT),
+                                sort_keys=True, default=str))
+        return tuple(parts)
+
     def __lt__(alist1, alist2):
         return alist1.cost < alist2.cost
 
@@ -339,3 +381,9 @@ class Contexts:
     datetime = 'datetime'
     device = 'device'
     place = 'place'
+
+
+# attributes with default values in the alist constructor
+_FIXED_ATTRIBUTES = {Attributes.OP, Attributes.SUBJECT, Attributes.PROPERTY, Attributes.OBJECT,
+                     Attributes.OPVAR, Attributes.COV, Attributes.TIME, Attributes.EXPLAIN,
+                     Attributes.FNPLOT, Attributes.CONTEXT}
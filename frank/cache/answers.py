@@ -0,0 +1,58 @@
+'''
+File: answers.py
+Description: Cache of final answers shared across query sessions.
+
+
+'''
+
+import json
+import threading
+from copy import deepcopy
+from cachetools import TTLCache
+from frank import config
+from frank.alist import Alist
+from frank.alist import Attributes as tt
+from frank.alist import Contexts as ctx
+
+# attributes that do not change the answer to a query
+IGNORED_ATTRIBUTES = [tt.ID, tt.COST, tt.EXPLAIN, tt.FNPLOT, tt.CONTEXT, 'meta',
+                      'what', 'why', 'how']
+
+lock = threading.Lock()
+answers = TTLCache(maxsize=max(1, config.config['answer_cache_size']),
+                   ttl=config.config['answer_cache_ttl'])
+
+
+def key(alist: Alist):
+    ''' Canonical key of a query alist and the context that affects its answer.
+        The alist should already have the query context injected, so the
+        environment datetime only matters through the time attribute.
+    '''
+    attributes = {k: v for k, v in alist.attributes.items()
+                  if k not in IGNORED_ATTRIBUTES}
+    context = alist.get(tt.CONTEXT) or [{}, {}, {}]
+    context = [dict(c) for c in context]
+    if len(context) > 1:
+        context[1].pop(ctx.datetime, None)
+    return json.dumps([attributes, context], sort_keys=True, default=str)
+
+
+def get(answer_key):
+    ''' Get a copy of the cached answer object or None '''
+    with lock:
+        answer = answers.get(answer_key)
+    return deepcopy(answer) if answer is not None else None
+
+
+def put(answer_key, answer):
+    ''' Cache the final answer object of a query '''
+    if config.config['answer_cache_size'] <= 0:
+        return
+    with lock:
+        answers[answer_key] = deepcopy(answer)
+
+
+def invalidate():
+    ''' Drop all cached answers, e.g. when the uncertainty priors change '''
+    with lock:
+        answers.clear()
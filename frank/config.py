@@ -23,7 +23,34 @@ server = {
     "visualize": False,
     "polynomial_degree": 1,
     "sparql_endpoint": "http://172.20.0.1:8890/sparql",
-    "thread_pool": 1,
+    "thread_pool": 4,
+    "kb_search_workers": 16,
+    "kb_search_timeout": 30,
+    "answer_cache_size": 1024,
+    "answer_cache_ttl": 3600,
+    # directory of the on-disk KB caches; defaults to frank/data/kb_cache
+    "kb_cache_dir": "",
+    "worldbank_series_ttl": 86400,
+    # sqlite store built by frank.kb.worldbank_store; defaults to frank/data/worldbank.sqlite
+    "worldbank_store": "",
+    # triple store built by frank.kb.triplestore; defaults to frank/data/triplestore
+    "triplestore_dir": "",
+    "entity_cache_size": 10000,
+    "entity_cache_ttl": 604800,
+    "entity_negative_ttl": 3600,
+    "property_domain_ttl": 604800,
+    # sharded sqlite caches on disk of the KB adapters; the size bound is per cache
+    "disk_cache_shards": 8,
+    "disk_cache_max_bytes": 268435456,
+    "kb_memoize_ttl": 604800,
+    "musicbrainz_ttl": 86400,
+    # KB lookups that found no data are not repeated for this long
+    "kb_negative_ttl": 600,
+    "kb_negative_cache_size": 10000,
+    # per-query budgets; 0 means no limit
+    "query_deadline": 0,
+    "max_kb_calls": 0,
+    "max_nodes": 0,
     "log_level": 10,
     "answer_sigdig": 4,
     "errorbar_sigdig": 2,
@@ -36,6 +63,25 @@ server = {
         "product": ["join", ["isa", "feature"]]
     },
     "use_db": False,
+    # seconds between updates to the priors and their write-back
+    "prior_flush_interval": 5,
+
+    # shared HTTP client of the KB adapters
+    "http_timeout": 30,
+    "http_retries": 3,
+    "http_backoff": 0.5,
+    "http_pool_size": 16,
+    "http_host_concurrency": 8,
+    # requests per second to a host; the rate and concurrency of a host adapt
+    # between a minimum and these maximums, set per host in http_host_limits
+    "http_rate": 10,
+    "http_latency_tolerance": 3.0,
+    # longest pause of a host asked for by a Retry-After header, in seconds
+    "http_max_pause": 60,
+    "http_host_limits": {
+        "query.wikidata.org": {"rate": 5, "concurrency": 5},
+        "musicbrainz.org": {"rate": 1, "concurrency": 1},
+    },
 
     "user-agent": f"FRANK {VERSION}"
 }
@@ -63,7 +109,34 @@ local = {
     "visualize": False,
     "polynomial_degree": 1,
     "sparql_endpoint": "http://frank-qa.nuamah.com:8890/sparql",
-    "thread_pool": 1,
+    "thread_pool": 4,
+    "kb_search_workers": 16,
+    "kb_search_timeout": 30,
+    "answer_cache_size": 1024,
+    "answer_cache_ttl": 3600,
+    # directory of the on-disk KB caches; defaults to frank/data/kb_cache
+    "kb_cache_dir": "",
+    "worldbank_series_ttl": 86400,
+    # sqlite store built by frank.kb.worldbank_store; defaults to frank/data/worldbank.sqlite
+    "worldbank_store": "",
+    # triple store built by frank.kb.triplestore; defaults to frank/data/triplestore
+    "triplestore_dir": "",
+    "entity_cache_size": 10000,
+    "entity_cache_ttl": 604800,
+    "entity_negative_ttl": 3600,
+    "property_domain_ttl": 604800,
+    # sharded sqlite caches on disk of the KB adapters; the size bound is per cache
+    "disk_cache_shards": 8,
+    "disk_cache_max_bytes": 268435456,
+    "kb_memoize_ttl": 604800,
+    "musicbrainz_ttl": 86400,
+    # KB lookups that found no data are not repeated for this long
+    "kb_negative_ttl": 600,
+    "kb_negative_cache_size": 10000,
+    # per-query budgets; 0 means no limit
+    "query_deadline": 0,
+    "max_kb_calls": 0,
+    "max_nodes": 0,
     "log_level": 10,
     "answer_sigdig": 4,
     "errorbar_sigdig": 2,
@@ -76,6 +149,25 @@ local = {
         "product": ["join", ["isa", "feature"]]
     },
     "use_db": False,
+    # seconds between updates to the priors and their write-back
+    "prior_flush_interval": 5,
+
+    # shared HTTP client of the KB adapters
+    "http_timeout": 30,
+    "http_retries": 3,
+    "http_backoff": 0.5,
+    "http_pool_size": 16,
+    "http_host_concurrency": 8,
+    # requests per second to a host; the rate and concurrency of a host adapt
+    # between a minimum and these maximums, set per host in http_host_limits
+    "http_rate": 10,
+    "http_latency_tolerance": 3.0,
+    # longest pause of a host asked for by a Retry-After header, in seconds
+    "http_max_pause": 60,
+    "http_host_limits": {
+        "query.wikidata.org": {"rate": 5, "concurrency": 5},
+        "musicbrainz.org": {"rate": 1, "concurrency": 1},
+    },
 
     "user-agent": f"FRANK/{VERSION}"
 }
@@ -43,12 +43,16 @@ def _get_context(alist: Alist, idx, key):
 
 
 def _set_context(alist: Alist, idx, key, value):
-    if not alist.attributes[tt.CONTEXT]:
-        alist.attributes[tt.CONTEXT] = [{}, {}, {}]
+    # contexts are shared between alists, so replace rather than modify them
+    context = alist.attributes[tt.CONTEXT]
+    if not context:
+        context = [{}, {}, {}]
     try:
-        alist.attributes[tt.CONTEXT][idx][key] = value
+        context = list(context)
+        context[idx] = {**context[idx], key: value}
     except:
         pass
+    alist.attributes[tt.CONTEXT] = context
 
 
 def inject_retrieval_context(alist: Alist, source) -> Alist:
@@ -85,9 +89,9 @@ def inject_query_context(alist: Alist) -> Alist:
             ctx.accuracy not in context[0] and \
             ctx.device in context[1]:
         if context[1][ctx.device] == 'phone':
-            context[0][ctx.accuracy] = 'low'
+            context = [{**context[0], ctx.accuracy: 'low'}, *context[1:]]
         elif context[1][ctx.device] == 'computer':
-            context[0][ctx.accuracy] = 'high'
+            context = [{**context[0], ctx.accuracy: 'high'}, *context[1:]]
 
     # alist context
     alist.set(tt.CONTEXT, context)
@@ -154,8 +158,11 @@ def flush(alist: Alist, items) -> Alist:
     """
     for k in items:
         try:
-            if k in alist.get(tt.CONTEXT)[2] and alist.get(tt.CONTEXT)[2][k] != alist.get(k):
-                del alist.get(tt.CONTEXT)[2][k]
+            context = alist.get(tt.CONTEXT)
+            if k in context[2] and context[2][k] != alist.get(k):
+                query_context = dict(context[2])
+                del query_context[k]
+                alist.set(tt.CONTEXT, [context[0], context[1], query_context])
         except:
             pass
 
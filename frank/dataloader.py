@@ -1,15 +1,74 @@
 import os
 import re
+import argparse
+import threading
 import pandas as pd
+from frank.util import columnar
 
+DATASETS = ['wikidata_props', 'worldbank_props', 'worldbank_countries',
+            'predicate_priors', 'source_priors']
+
+# datasets loaded in this process, keyed by filename, with the 
+# modification time and size of the pickle they were loaded from
+registry = {}
+registry_lock = threading.Lock()
 
-def load_data(filename):
-    ''' load wikidata properties in a pandas dataframe from a pickle file'''
-    ''
 
+def data_path(filename):
     directory = os.path.join(os.path.dirname(
         os.path.abspath(__file__)), 'data')
-    filepath = os.path.join(directory, filename)
+    return os.path.join(directory, filename)
+
+
+def file_version(path):
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def columnar_path(filename):
+    return data_path(filename) + '.columns'
+
+
+def dataset_file(filename):
+    ''' The file a dataset is loaded from: the meta file of its columnar 
+    table unless the pickle is newer, else the pickle.
+    '''
+    pickle_file = data_path(filename) + '.pickle'
+    meta_file = os.path.join(columnar_path(filename), columnar.META_FILE)
+    if os.path.isfile(meta_file) and (not os.path.isfile(pickle_file) or
+                                      os.path.getmtime(meta_file) >= os.path.getmtime(pickle_file)):
+        return meta_file
+    return pickle_file
+
+
+def load_data(filename):
+    ''' Load a dataset in a pandas dataframe from its columnar table or 
+    pickle file.
+    The dataframe is shared by all callers and must not be modified; 
+    copy it first. It is loaded again only when the file changes.
+    '''
+    with registry_lock:
+        entry = registry.get(filename)
+        if entry is not None:
+            try:
+                if file_version(dataset_file(filename)) == entry[0]:
+                    return entry[1]
+            except OSError:
+                pass
+        path = dataset_file(filename)
+        if path.endswith(columnar.META_FILE):
+            df = columnar.read_table(columnar_path(filename))
+        else:
+            df = read_data(filename)
+            path = dataset_file(filename)
+        registry[filename] = (file_version(path), df)
+        return df
+
+
+def read_data(filename):
+    ''' Read a dataset from its pickle file, downloading it if missing '''
+    directory = os.path.dirname(data_path(filename))
+    filepath = data_path(filename)
 
     if not os.path.exists(directory):
         os.makedirs(directory)
@@ -17,7 +76,7 @@ def load_data(filename):
     csv_file = filepath + '.csv'
     pickle_file = filepath + '.pickle'
     if os.path.isfile(pickle_file) is False:
-        if os.path.isfile(pickle_file) is False:
+        if os.path.isfile(csv_file) is False:
             df = pd.read_csv(
                 f'https://franklab.s3-eu-west-1.amazonaws.com/datasets/{filename}.csv')
             df.to_csv(filepath + '.csv')
@@ -29,6 +88,15 @@ def load_data(filename):
     return df
 
 
+def invalidate(filename=None):
+    ''' Drop a dataset, or all datasets, from the registry '''
+    with registry_lock:
+        if filename is None:
+            registry.clear()
+        else:
+            registry.pop(filename, None)
+
+
 def load_wikidata_props():
     return load_data('wikidata_props')
 
@@ -58,6 +126,34 @@ def save_source_priors(df: pd.DataFrame):
 
 
 def update_data(df: pd.DataFrame, filename):
-    filepath = os.path.join(os.path.dirname(
-        os.path.abspath(__file__)), 'data', filename + '.pickle')
-    df.to_pickle(filepath)
+    pickle_file = data_path(filename) + '.pickle'
+    tmp_file = pickle_file + '.tmp'
+    with registry_lock:
+        df.to_pickle(tmp_file)
+        os.replace(tmp_file, pickle_file)
+        if os.path.isdir(columnar_path(filename)):
+            # keep the columnar table in step with the pickle
+            columnar.write_table(df, columnar_path(filename))
+        registry[filename] = (file_version(dataset_file(filename)), df)
+
+
+def convert_data(filename):
+    ''' Write a dataset as a columnar table that is memory-mapped on load '''
+    with registry_lock:
+        df = read_data(filename)
+        columnar.write_table(df, columnar_path(filename))
+        registry.pop(filename, None)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        prog="python -m frank.dataloader",
+        description="Manage the datasets used by FRANK")
+    argparser.add_argument("command", choices=["convert"],
+        help="convert: write datasets as memory-mapped columnar tables")
+    argparser.add_argument("datasets", nargs="*", default=DATASETS,
+        help=f"datasets to convert; (default = {' '.join(DATASETS)})")
+    args = argparser.parse_args()
+    for name in args.datasets:
+        convert_data(name)
+        print(f"{name} -> {columnar_path(name)}")
@@ -5,6 +5,9 @@ Description: InferenceGraph for FRANK
 
 '''
 
+import heapq
+import itertools
+import threading
 import networkx as nx
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
@@ -16,13 +19,57 @@ from frank.alist import NodeTypes as nt
 class InferenceGraph(nx.DiGraph):
     def __init__(self):
         nx.DiGraph.__init__(self)
+        # guards graph updates made by concurrent scheduler workers
+        self.lock = threading.RLock()
+        # per-state heaps of (cost, depth, seq, node_id) frontier entries.
+        # Entries are invalidated lazily: only the latest entry pushed for 
+        # a node is live, and it is checked against the node when popped.
+        # A heap is rebuilt from the live entries once it holds twice as 
+        # many stale entries as live ones.
+        self.frontier_heaps = {}
+        self.frontier_latest = {}
+        self.frontier_live = {}
+        self.frontier_seq = itertools.count()
+        # called with the ids of the nodes removed by each prune
+        self.prune_callbacks = []
 
     def add_alist(self, alist: Alist):
-        self.add_nodes_from([(alist.id, alist.attributes)])
+        with self.lock:
+            self.add_nodes_from([(alist.id, alist.attributes)])
+            self.push_frontier(alist.id)
 
     def add_alists_from(self, alists: list):
         node_list = [(a.id, a.attributes) for a in alists]
-        self.add_nodes_from(node_list)
+        with self.lock:
+            self.add_nodes_from(node_list)
+            for a in alists:
+                self.push_frontier(a.id)
+
+    def push_frontier(self, alist_id):
+        ''' Index a node in the frontier heap of its current state, unless 
+        its live entry already has the same state, cost and depth.
+        '''
+        meta = self.nodes[alist_id]['meta']
+        state = meta['state']
+        latest = self.frontier_latest.get(alist_id)
+        if latest is not None and latest[0] == state and \
+                latest[1][:2] == (meta['cost'], meta['depth']):
+            return
+        self.drop_frontier(alist_id)
+        entry = (meta['cost'], meta['depth'], next(self.frontier_seq), alist_id)
+        self.frontier_latest[alist_id] = (state, entry)
+        self.frontier_live[state] = self.frontier_live.get(state, 0) + 1
+        heap = self.frontier_heaps.setdefault(state, [])
+        heapq.heappush(heap, entry)
+        if len(heap) > max(64, 3 * self.frontier_live[state]):
+            heap[:] = [e for s, e in self.frontier_latest.values() if s == state]
+            heapq.heapify(heap)
+
+    def drop_frontier(self, alist_id):
+        ''' Invalidate the live frontier entry of a node '''
+        latest = self.frontier_latest.pop(alist_id, None)
+        if latest is not None:
+            self.frontier_live[latest[0]] -= 1
 
     def display(self):
         # plt.plot()
@@ -35,34 +82,42 @@ class InferenceGraph(nx.DiGraph):
         # plt.show(block=False)
 
     def parent_alists(self, alist_id):
-        pred = self.predecessors(alist_id)
-        pred_arr = [Alist(**self.nodes[x]) for x in pred]
+        with self.lock:
+            pred = self.predecessors(alist_id)
+            pred_arr = [Alist.view(self.nodes[x]) for x in pred]
         return pred_arr
 
     def child_alists(self, alist_id):
-        succ = self.successors(alist_id)
-        succ_arr = [Alist(**self.nodes[x]) for x in succ]
+        with self.lock:
+            succ = self.successors(alist_id)
+            succ_arr = [Alist.view(self.nodes[x]) for x in succ]
         return succ_arr
 
     def parent_ids(self, alist_id):
-        pred = self.predecessors(alist_id)
-        pred_arr = [x for x in pred]
+        with self.lock:
+            pred = self.predecessors(alist_id)
+            pred_arr = [x for x in pred]
         return pred_arr
 
     def child_ids(self, alist_id):
-        succ = self.successors(alist_id)
-        succ_arr = [x for x in succ]
+        with self.lock:
+            succ = self.successors(alist_id)
+            succ_arr = [x for x in succ]
         return succ_arr
 
     def alist(self, alist_id):
+        ''' Get a view of the alist stored at the node. 
+        Changes to the alist update the node in place.
+        '''
         try:
-            alist = Alist(**self.nodes[alist_id])
+            alist = Alist.view(self.nodes[alist_id])
             return alist
         except:
             return None
 
     def alists(self):
-        alists = [Alist(**self.nodes[x]) for x in self.nodes()]
+        with self.lock:
+            alists = [Alist.view(self.nodes[x]) for x in self.nodes()]
         return alists
 
     def alists_and_edges(self):
@@ -71,7 +126,8 @@ class InferenceGraph(nx.DiGraph):
         return edges
 
     def ui_graph(self):
-        nodes = [dict(x.attributes) for x in self.alists()]
+        with self.lock:
+            nodes = [dict(x.attributes) for x in self.alists()]
         nodes_arr = []
         for n in nodes:
             n.update(n['meta'])
@@ -86,24 +142,29 @@ class InferenceGraph(nx.DiGraph):
         return {'nodes': nodes, 'edges': edges}
         
     def link(self, parent:Alist, child:Alist, edge_label='', create_new_id=True):
-        if parent:
-            succ = self.successors(parent.id)
-            succ_nodes = [self.nodes[x] for x in succ]
-            if create_new_id:
-                child.depth = parent.depth + 1
-                child.id = f"{parent.depth + 1}{parent.id}{len(succ_nodes) + 1}"
-            self.add_alist(child)
-            self.add_edge(parent.id, child.id, **{'label': edge_label})
-        else:
-            self.add_alist(child)
+        with self.lock:
+            if parent:
+                succ = self.successors(parent.id)
+                succ_nodes = [self.nodes[x] for x in succ]
+                if create_new_id:
+                    child.depth = parent.depth + 1
+                    child.id = f"{parent.depth + 1}{parent.id}{len(succ_nodes) + 1}"
+                self.add_alist(child)
+                self.add_edge(parent.id, child.id, **{'label': edge_label})
+                # the parent is no longer a leaf; its frontier entry is 
+                # dropped when popped
+            else:
+                self.add_alist(child)
 
     def leaf_nodes(self, sort=False, sort_key=None):
-        nodes = [x for x in self.nodes() if self.out_degree(x) == 0]
+        with self.lock:
+            nodes = [x for x in self.nodes() if self.out_degree(x) == 0]
         return nodes
 
     def leaf_alists(self, sort=False, sort_key=None):
-        nodes = [Alist(**self.nodes[x])
-                 for x in self.nodes() if self.out_degree(x) == 0]
+        with self.lock:
+            nodes = [Alist.view(self.nodes[x])
+                     for x in self.nodes() if self.out_degree(x) == 0]
 
         if sort and sort_key:
             nodes.sort(key=sort_key)
@@ -113,26 +174,68 @@ class InferenceGraph(nx.DiGraph):
         return nodes
 
     def prune(self, alist_id):
-        succ = nx.bfs_successors(self, alist_id)
-        for s in succ:
-            self.remove_nodes_from(s[1])
-        self.remove_node(alist_id)
+        with self.lock:
+            parents = list(self.predecessors(alist_id))
+            succ = list(nx.bfs_successors(self, alist_id))
+            removed = [alist_id]
+            for s in succ:
+                self.remove_nodes_from(s[1])
+                for x in s[1]:
+                    self.drop_frontier(x)
+                removed.extend(s[1])
+            self.remove_node(alist_id)
+            self.drop_frontier(alist_id)
+            # parents left without children are leaves again
+            for p in parents:
+                if self.out_degree(p) == 0:
+                    self.push_frontier(p)
+        for callback in self.prune_callbacks:
+            callback(removed)
 
     def frontier(self, size=1, update_state=True, state=st.UNEXPLORED):
-        ''' Get a leaf node that are not in a reducible state '''
-        sorted_leaves = self.leaf_alists(sort=True)
-        top = []
-        for n in sorted_leaves:
-            if n.state == state:
-                top.append(n)
-            if len(top) >= size:
-                break
-        if update_state:
-            for t in top:
-                t.state = st.EXPLORING
-                self.add_alist(t)
-
-        return top
+        ''' Get up to `size` leaf nodes in the given state, cheapest first.
+
+        When `update_state` is True, the selected nodes are moved to the
+        EXPLORING state in the same critical section, so concurrent workers
+        never pick the same node twice.
+
+        Leaves are popped from the per-state frontier heap in O(log N) 
+        rather than scanning and sorting all leaves of the graph.
+        '''
+        with self.lock:
+            heap = self.frontier_heaps.setdefault(state, [])
+            top = []
+            updated = []
+            while heap and len(top) < size:
+                entry = heapq.heappop(heap)
+                cost, depth, seq, alist_id = entry
+                latest = self.frontier_latest.get(alist_id)
+                if latest is None or latest[1] != entry:
+                    continue  # stale entry
+                if alist_id not in self or self.out_degree(alist_id) > 0:
+                    # indexed again if it becomes a leaf
+                    self.drop_frontier(alist_id)
+                    continue
+                meta = self.nodes[alist_id]['meta']
+                if (meta['state'], meta['cost'], meta['depth']) != (state, cost, depth):
+                    # node was updated in place; re-index it
+                    self.drop_frontier(alist_id)
+                    updated.append(alist_id)
+                    continue
+                top.append((entry, Alist(**self.nodes[alist_id])))
+            # the heap is only pushed to, and so maybe rebuilt, once the 
+            # selected entries are no longer held here
+            for entry, t in top:
+                if not update_state:
+                    heapq.heappush(heap, entry)
+            for alist_id in updated:
+                self.push_frontier(alist_id)
+            for entry, t in top:
+                if update_state:
+                    t.state = st.EXPLORING
+                    self.add_alist(t)
+
+        return [t for _, t in top]
 
     def blanket_subgraph(self, alist_id, ancestor_length=1, descendant_length=1):
         ancestors = nx.single_target_shortest_path(
@@ -9,6 +9,10 @@ import datetime
 import random
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import networkx as nx
 
 import frank.cache.logger as clogger
 import frank.map.map_wrapper
@@ -37,8 +41,10 @@ from frank.alist import Attributes as tt
 from frank.alist import Branching as br
 from frank.alist import NodeTypes as nt
 from frank.alist import States as states
+from frank.alist import VarPrefix as vx
 from frank import config
-from frank.kb import rdf, wikidata, worldbank, musicbrainz, jsonld
+from frank.kb import rdf, wikidata, worldbank, musicbrainz, jsonld, triplestore
+from frank.kb.utils.cache import negative_lookups
 from .explain import Explanation
 from frank import processLog
 from frank.uncertainty.sourcePrior import SourcePrior as sourcePrior
@@ -80,8 +86,45 @@ class Infer:
     explainer: Explanation
         An object to generate explanations.     
 
+    propagation_lock : threading.RLock
+        Serializes propagation of instantiations to the root node when 
+        several alists are resolved concurrently by the scheduler.
+
+    subgoals : dict
+        Id of the node that resolves each sub-goal in the graph, keyed by 
+        alist signature.
+
+    subgoal_followers : dict
+        Ids of the nodes waiting on the resolution of a sub-goal, keyed by 
+        the id of the node resolving it.
+
+    reduce_states : dict
+        Running state of incremental reduce operations, keyed by the id 
+        of the alist being reduced.
+
+    deadline : float
+        Time by which the query must be answered, or None for no deadline.
+
+    stopped : bool
+        True once the scheduler has published its final answer. Workers still 
+        running then no longer propagate to the root.
+
+    max_kb_calls : int
+        Maximum number of KB source searches for the query; 0 for no limit.
+
+    kb_calls : int
+        Number of KB source searches made so far.
+
+    prefetched : dict
+        Facts fetched for whole sets of temporal siblings, keyed by 
+        (source, subject, property) and then by year.
+
     """
 
+    # shared by all sessions to fan out KB searches across sources
+    source_pool = ThreadPoolExecutor(
+        max_workers=config.config['kb_search_workers'])
+
     def __init__(self, G: InferenceGraph):
         """
         Parameters
@@ -97,12 +140,34 @@ class Infer:
         self.propagated_alists = []
         self.root = None
         self.explainer = Explanation()
+        self.propagation_lock = threading.RLock()
+        self.property_refs_lock = threading.Lock()
+        self.subgoals = {}
+        self.subgoal_followers = {}
+        self.subgoal_lock = threading.RLock()
+        self.reduce_states = {}
+        self.G.prune_callbacks.append(self.forget_pruned)
+        self.deadline = None
+        self.stopped = False
+        self.max_kb_calls = 0
+        self.kb_calls = 0
+        self.budget_lock = threading.Lock()
+        self.prefetched = {}
+        self.prefetch_lock = threading.Lock()
 
     def enqueue_root(self, alist):
         """ Add alist as the root node of the inference graph"""
         self.root = alist
         self.G.add_alist(alist)
 
+    def past_deadline(self):
+        """ Return True if the deadline of the query has passed """
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def kb_budget_exhausted(self):
+        """ Return True if the query has used up its KB search budget """
+        return self.max_kb_calls > 0 and self.kb_calls >= self.max_kb_calls
+
     def run_frank(self, alist: Alist):
         """ Run the FRANK algorithm for an alist
 
@@ -123,6 +188,8 @@ class Infer:
         """
         self.last_heartbeat = time.time()
         curr_propagated_alists = []
+        if self.stopped or self.past_deadline():
+            return curr_propagated_alists
         self.max_depth = alist.depth
         if alist.state is states.PRUNED:
             self.write_trace(
@@ -151,6 +218,8 @@ class Infer:
             self.G.add_alist(alist)
         # if OPVAR not instantiated, search KB
         elif not bool_result:
+            if self.follow_subgoal(alist):
+                return curr_propagated_alists
             bool_result = self.search_kb(alist)
         # search kb for the variable instantiation
 
@@ -162,26 +231,164 @@ class Infer:
             if agg_instantiated and proj_instantiated:
                 alist.state = states.REDUCIBLE
                 self.G.add_alist(alist)
-            if self.G.child_ids(alist.id):
-                is_propagated = self.propagate(self.G.child_ids(alist.id)[0])
-            else:
-                is_propagated = self.propagate(
-                    self.G.child_ids(self.G.parent_ids(alist.id)[0])[0])
-
-            if is_propagated:
-                prop_alist = self.G.alist(self.root.id)
-                self.write_trace(f"{pcol.CYAN}intermediate ans: "
-                                 f"{pcol.RESET}-{prop_alist}{pcol.RESETALL}",
-                                 loglevel=processLog.LogLevel.ANSWER)
-                curr_propagated_alists.append(prop_alist.copy())
-                self.propagated_alists.append(prop_alist.copy())
+            # only one worker at a time may aggregate up to the root
+            with self.propagation_lock:
+                if self.stopped:
+                    # the final answer has already been published
+                    return curr_propagated_alists
+                if self.G.child_ids(alist.id):
+                    is_propagated = self.propagate(self.G.child_ids(alist.id)[0])
+                else:
+                    is_propagated = self.propagate(
+                        self.G.child_ids(self.G.parent_ids(alist.id)[0])[0])
+
+                if is_propagated:
+                    prop_alist = self.G.alist(self.root.id)
+                    self.write_trace(f"{pcol.CYAN}intermediate ans: "
+                                     f"{pcol.RESET}-{prop_alist}{pcol.RESETALL}",
+                                     loglevel=processLog.LogLevel.ANSWER)
+                    curr_propagated_alists.append(prop_alist.copy())
+                    self.propagated_alists.append(prop_alist.copy())
         else:
             alist.state = states.EXPLORED
             self.G.add_alist(alist)
             for mapOp in self.get_map_strategy(alist):
                 self.decompose(alist, mapOp)
+            if not self.G.child_ids(alist.id):
+                # nothing found and nothing to decompose into
+                self.release_exhausted()
         return curr_propagated_alists
 
+    def follow_subgoal(self, alist: Alist):
+        """ Check if an identical sub-goal is already being resolved elsewhere 
+        in the inference graph.
+
+        Args
+        ----
+        alist : Alist
+
+        Return
+        ------
+        Returns True if the alist will take its instantiation from the node 
+        resolving the sub-goal instead of searching and decomposing.
+
+        Notes
+        -----
+        The first alist with a given signature resolves the sub-goal. Later 
+        alists with the same signature wait in the EXPLORED state and are 
+        made reducible once the first one is reduced, or are put back in 
+        the UNEXPLORED state once its subtree is exhausted without a result 
+        (see `release_exhausted`). An alist never waits on one of its own 
+        ancestors.
+        """
+        signature = alist.signature()
+        # the subgoal lock is always taken before the graph lock
+        with self.subgoal_lock:
+            leader_id = self.subgoals.get(signature)
+            with self.G.lock:
+                lead = leader_id is None or leader_id == alist.id or \
+                    leader_id not in self.G or nx.has_path(self.G, leader_id, alist.id)
+            if lead:
+                self.subgoals[signature] = alist.id
+                return False
+            self.subgoal_followers.setdefault(leader_id, []).append(alist.id)
+            alist.state = states.EXPLORED
+            self.G.add_alist(alist)
+            self.write_trace(
+                f"{pcol.MAGENTA}follow {leader_id} {alist.id}{pcol.RESET}-{alist}{pcol.RESETALL}")
+            leader = self.G.alist(leader_id)
+            if leader.state in [states.REDUCIBLE, states.REDUCED]:
+                self.resolve_subgoal(leader)
+        return True
+
+    def release_exhausted(self):
+        """ Release the followers of the sub-goals whose node can no longer 
+        be reduced: it was pruned, or nothing in its subtree is still to be 
+        explored or reduced, e.g. because its children were pruned, ignored 
+        or failed to aggregate.
+        """
+        with self.subgoal_lock:
+            if not self.subgoal_followers:
+                return
+            with self.G.lock:
+                followers = set(follower_id for ids in self.subgoal_followers.values()
+                                for follower_id in ids)
+                exhausted = [leader_id for leader_id in self.subgoal_followers
+                             if self.subtree_exhausted(leader_id, followers)]
+            for leader_id in exhausted:
+                self.release_followers(leader_id)
+
+    def subtree_exhausted(self, alist_id: str, followers: set):
+        """ Return True if an alist is not in the graph, or it is not reduced 
+        and no alist in its subtree is still to be explored, reduced or 
+        waiting on a sub-goal. The caller holds the graph lock.
+        """
+        if alist_id not in self.G:
+            return True
+        if self.G.alist(alist_id).state in [states.REDUCIBLE, states.REDUCED]:
+            return False
+        for node_id in [alist_id] + list(nx.descendants(self.G, alist_id)):
+            if node_id in followers or self.G.alist(node_id).state in \
+                    [states.UNEXPLORED, states.EXPLORING, states.REDUCIBLE]:
+                return False
+        return True
+
+    def release_followers(self, leader_id: str):
+        """ Put the alists waiting on a sub-goal back in the UNEXPLORED state 
+        when the node resolving it ends without a result, so that they are 
+        searched and decomposed themselves.
+
+        Args
+        ----
+        leader_id : str
+            Id of the node that was resolving the sub-goal.
+        """
+        with self.subgoal_lock:
+            follower_ids = self.subgoal_followers.pop(leader_id, [])
+            for signature, subgoal_leader in list(self.subgoals.items()):
+                if subgoal_leader == leader_id:
+                    del self.subgoals[signature]
+        for follower_id in follower_ids:
+            follower = self.G.alist(follower_id)
+            if follower is None or follower.state != states.EXPLORED:
+                continue
+            follower.state = states.UNEXPLORED
+            self.G.add_alist(follower)
+            self.write_trace(
+                f"{pcol.MAGENTA}released {follower.id}{pcol.RESET}-{follower}{pcol.RESETALL}")
+
+    def resolve_subgoal(self, leader: Alist):
+        """ Copy the instantiation of a reduced alist to the alists waiting 
+        on the same sub-goal and make them reducible.
+
+        Args
+        ----
+        leader : Alist
+            Reduced alist that resolved the sub-goal.
+        """
+        with self.subgoal_lock:
+            follower_ids = list(self.subgoal_followers.get(leader.id, []))
+        for follower_id in follower_ids:
+            follower = self.G.alist(follower_id)
+            if follower is None:
+                continue
+            for attr in [tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME]:
+                if not follower.is_instantiated(attr) and leader.is_instantiated(attr) and \
+                        str(follower.get(attr)).startswith((vx.AUXILLIARY, vx.NESTING, vx.PROJECTION)):
+                    follower.instantiate_variable(
+                        follower.get(attr), leader.instantiation_value(attr))
+            follower.instantiate_variable(follower.get(tt.OPVAR),
+                                          leader.instantiation_value(leader.get(tt.OPVAR)))
+            follower.instantiate_variable(tt.COV, leader.get(tt.COV))
+            for k in ['what', 'how']:
+                if k in leader.attributes:
+                    follower.set(k, leader.get(k))
+            follower.data_sources = list(leader.data_sources)
+            follower.state = states.REDUCIBLE
+            self.G.add_alist(follower)
+            self.write_trace(
+                f"{pcol.MAGENTA}tabled {follower.id}{pcol.RESET}-{follower}{pcol.RESETALL}")
+
     def search_kb(self, alist: Alist):
         """ Search knowledge bases to instantiate variables in alist.
 
@@ -193,9 +400,16 @@ class Infer:
         ------
         Returns `True` if variable instantiation is successful from a KB search.
 
+        Notes
+        -----
+        The local triple store is searched first; the remote sources are 
+        only searched if it has no facts, and are searched concurrently. 
+        Facts are merged in the order the sources finish; sources that do 
+        not respond within the `kb_search_timeout` deadline, or before the 
+        deadline of the query, are skipped. No sources are searched once 
+        the KB call budget of the query is used up.
         """
         self.last_heartbeat = time.time()
-        prop_refs = []
         found_facts = []
         # cannot search if alist has uninstantiated nested variables
         if alist.uninstantiated_nesting_variables():
@@ -209,7 +423,6 @@ class Infer:
             new_alist.set(tt.OPVAR, alist.get(tt.OPVAR))
             return True
 
-        prop_string = alist.get(tt.PROPERTY)        
         sources = {
             'wikidata': {'fn': wikidata, 'trust': 'low'}, 
             'worldbank': {'fn': worldbank, 'trust': 'high'},
@@ -223,105 +436,58 @@ class Infer:
         context_store = {}
         context_store = {**context[0], **context[1],
                          **context[2]} if context else {}
+
+        # the local triple store is searched first, without a KB call;
+        # the remote sources are only searched if it has no facts
+        local_source = {'fn': triplestore, 'trust': 'low'}
+        if triplestore.available() and not (context_store.get(ctx.trust) == 'high'
+                                            and local_source['trust'] != 'high'):
+            try:
+                found_facts.extend(self.search_source(
+                    alist, 'wikidata_local', local_source))
+            except Exception as ex:
+                self.write_trace(
+                    f"{pcol.RED}Search Error{pcol.RESETALL}", processLog.LogLevel.ERROR)
+                print(str(ex))
+            if found_facts:
+                sources = {}
+
+        futures = {}
         for source_name, source in sources.items():
             # check context for trust
             if ctx.trust in context_store:
                 if context_store[ctx.trust] == 'high' and source['trust'] != 'high':
                     continue
-            # for source_name, source in {'worldbank':worldbank}.items():
-            search_alist = alist.copy()
-            # inject context into IR
-            search_alist = frank.context.inject_retrieval_context(
-                search_alist, source_name)
-
-            # if the property_refs does not contain an entry for the property in this alist
-            # search KB for a ref for the property
-            prop_sources = []
-            if prop_string in self.property_refs:
-                prop_sources = [x[1] for x in self.property_refs[prop_string]]
-
-            if (prop_string not in self.property_refs and not prop_string.startswith('__')) \
-                    or (prop_string in self.property_refs and source_name not in prop_sources):
-
-                props = source['fn'].search_properties(prop_string)
-
-                if len(props) > 0:
-                    maxScore = 0
-                    for p in props:
-                        if p[2] >= maxScore:
-                            prop_refs.append((p, source_name))
-                            self.reverse_property_refs[p[0]] = prop_string
-                            maxScore = p[2]
-                        else:
-                            break
-                self.property_refs[prop_string] = prop_refs
-
-            search_attr = tt.SUBJECT
-            uninstantiated_variables = search_alist.uninstantiated_attributes()
-            if tt.SUBJECT in uninstantiated_variables:
-                search_attr = tt.SUBJECT
-            elif tt.OBJECT in uninstantiated_variables:
-                search_attr = tt.OBJECT
-            elif tt.TIME in uninstantiated_variables:
-                search_attr = tt.TIME
-
-            cache_found_flag = False
-            if config.config['use_cache']:
-                searchable_attr = list(filter(lambda x: x != search_attr,
-                                              [tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME]))
-                # search with original property name
-                (cache_found_flag, results) = (False, [])
-                # (cache_found_flag, results) = frank.cache.neo4j.search_cache(alist_to_instantiate=search_alist,
-                #                                                         attribute_to_instantiate=search_attr,
-                #                                                         search_attributes=searchable_attr)
-                if cache_found_flag == True:
-                    found_facts.append(results[0])
-                # search with source-specific property IDs
-
-                for (propid, _source_name) in self.property_refs[prop_string]:
-                    self.last_heartbeat = time.time()
-                    search_alist.set(tt.PROPERTY, propid[0])
-                    (cache_found_flag, results) = (False, [])
-                    #  = frank.cache.neo4j.search_cache(alist_to_instantiate=search_alist,
-                    #                                                         attribute_to_instantiate=search_attr,
-                    #                                                         search_attributes=searchable_attr)
-                    if cache_found_flag == True:
-                        found_facts.append(results[0])
-                        self.write_trace(
-                            f'{pcol.MAGENTA}found: cache{pcol.RESETALL}')
-                # if not found_facts:
-                #     self.write_trace('found:>>> cache')
-            if not cache_found_flag and prop_string in self.property_refs:
-                # search for data for each property reference source
-                for propid_label, _source_name in self.property_refs[prop_string]:
-                    self.last_heartbeat = time.time()
-
-                    try:
-                        if _source_name == source_name:
-                            search_alist.set(tt.PROPERTY, propid_label[0])
-                            found_facts.extend(source['fn'].find_property_values(
-                                search_alist, search_attr))
-                            # TODO: handle location search in less adhoc manner
-                            if alist.get(tt.PROPERTY).lower() == "location":
-                                if search_attr == tt.SUBJECT:
-                                    found_facts.extend(
-                                        wikidata.part_of_relation_subject(search_alist))
-                                elif search_attr == tt.OBJECT:
-                                    found_facts.extend(
-                                        wikidata.part_of_relation_object(search_alist))
-                            break
-                    except Exception as ex:
-                        self.write_trace(
-                            f"{pcol.RED}Search Error{pcol.RESETALL}", processLog.LogLevel.ERROR)
-                        print(str(ex))
-            if not found_facts and alist.get(tt.PROPERTY).startswith('__geopolitical:'):
-                if search_attr == tt.SUBJECT:
-                    found_facts.extend(
-                        wikidata.part_of_geopolitical_subject(search_alist))
-            # TODO: save facts found to cache if caching is enabled
-            # if foundFacts and config.config['use_cache']:
-            #     for ff in foundFacts:
-            #         cache().save(ff, ff.dataSources[0])
+            if self.known_empty(alist, source_name):
+                continue
+            with self.budget_lock:
+                if self.kb_budget_exhausted():
+                    break
+                self.kb_calls += 1
+            futures[Infer.source_pool.submit(
+                self.search_source, alist, source_name, source)] = source_name
+        if not futures and not found_facts and self.kb_budget_exhausted():
+            self.write_trace(
+                f"{pcol.RED}search budget exhausted {alist.id}{pcol.RESETALL}",
+                processLog.LogLevel.WARNING)
+            return False
+
+        timeout = config.config['kb_search_timeout']
+        if self.deadline is not None:
+            timeout = max(0, min(timeout, self.deadline - time.time()))
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                try:
+                    found_facts.extend(future.result())
+                except Exception as ex:
+                    self.write_trace(
+                        f"{pcol.RED}Search Error{pcol.RESETALL}", processLog.LogLevel.ERROR)
+                    print(str(ex))
+        except FuturesTimeoutError:
+            pending = [name for f, name in futures.items() if not f.done()]
+            self.write_trace(
+                f"{pcol.RED}search timeout {alist.id}{pcol.RESET} {', '.join(pending)}{pcol.RESETALL}",
+                processLog.LogLevel.WARNING)
 
         if found_facts:
             self.last_heartbeat = time.time()
@@ -329,7 +495,7 @@ class Infer:
             non_numeric_data_items = []
             numeric_data_items = []
 
-            for ff in found_facts:
+            for ff, search_attr in found_facts:
                 self.last_heartbeat = time.time()
                 if utils.is_numeric(ff.get(search_attr)):
                     numeric_data_items.append(
@@ -358,6 +524,275 @@ class Infer:
                     f'  {pcol.MAGENTA}found:{pcol.RESET} {str(ff)}{pcol.RESETALL}')
         return len(found_facts) > 0
 
+    @staticmethod
+    def search_attribute(alist: Alist):
+        """ The attribute of an alist to instantiate from a KB search """
+        uninstantiated_variables = alist.uninstantiated_attributes()
+        if tt.SUBJECT in uninstantiated_variables:
+            return tt.SUBJECT
+        elif tt.OBJECT in uninstantiated_variables:
+            return tt.OBJECT
+        elif tt.TIME in uninstantiated_variables:
+            return tt.TIME
+        return tt.SUBJECT
+
+    def known_empty(self, alist: Alist, source_name: str):
+        """ Check if searching a source for an alist is known to find nothing.
+
+        Args
+        ----
+        alist : Alist
+
+        source_name : str
+
+        Return
+        ------
+        `True` if the property of the alist has been matched in the source 
+        and the lookup is in the negative cache.
+
+        """
+        prop_string = alist.get(tt.PROPERTY)
+        # location searches also look up part-of relations in wikidata
+        if prop_string.lower() == 'location':
+            return False
+        with self.property_refs_lock:
+            refs = [p for p, name in self.property_refs.get(prop_string, [])
+                    if name == source_name]
+        if not refs:
+            return False
+        search_alist = frank.context.inject_retrieval_context(
+            alist.copy(), source_name)
+        search_attr = Infer.search_attribute(search_alist)
+        search_alist.set(tt.PROPERTY, refs[0][0])
+        return negative_lookups.is_empty(source_name, search_alist, search_attr)
+
+    def search_source(self, alist: Alist, source_name: str, source: dict):
+        """ Search a single knowledge base to instantiate variables in alist.
+
+        Args
+        ----
+        alist : Alist
+
+        source_name : str
+
+        source : dict
+            The KB module (`fn`) and its `trust` level.
+
+        Return
+        ------
+        A list of (fact alist, instantiated attribute) pairs.
+
+        """
+        found_facts = []
+        prop_string = alist.get(tt.PROPERTY)
+        search_alist = alist.copy()
+        # inject context into IR
+        search_alist = frank.context.inject_retrieval_context(
+            search_alist, source_name)
+
+        # if the property_refs does not contain an entry for the property in this alist
+        # search KB for a ref for the property
+        prop_sources = []
+        if prop_string in self.property_refs:
+            prop_sources = [x[1] for x in self.property_refs[prop_string]]
+
+        if (prop_string not in self.property_refs and not prop_string.startswith('__')) \
+                or (prop_string in self.property_refs and source_name not in prop_sources):
+
+            props = source['fn'].search_properties(prop_string)
+            prop_refs = []
+            if len(props) > 0:
+                maxScore = 0
+                for p in props:
+                    if p[2] >= maxScore:
+                        prop_refs.append((p, source_name))
+                        self.reverse_property_refs[p[0]] = prop_string
+                        maxScore = p[2]
+                    else:
+                        break
+            with self.property_refs_lock:
+                self.property_refs.setdefault(prop_string, []).extend(prop_refs)
+
+        search_attr = Infer.search_attribute(search_alist)
+
+        cache_found_flag = False
+        if config.config['use_cache']:
+            searchable_attr = list(filter(lambda x: x != search_attr,
+                                          [tt.SUBJECT, tt.PROPERTY, tt.OBJECT, tt.TIME]))
+            # search with original property name
+            (cache_found_flag, results) = (False, [])
+            # (cache_found_flag, results) = frank.cache.neo4j.search_cache(alist_to_instantiate=search_alist,
+            #                                                         attribute_to_instantiate=search_attr,
+            #                                                         search_attributes=searchable_attr)
+            if cache_found_flag == True:
+                found_facts.append(results[0])
+            # search with source-specific property IDs
+
+            for (propid, _source_name) in self.property_refs[prop_string]:
+                self.last_heartbeat = time.time()
+                search_alist.set(tt.PROPERTY, propid[0])
+                (cache_found_flag, results) = (False, [])
+                #  = frank.cache.neo4j.search_cache(alist_to_instantiate=search_alist,
+                #                                                         attribute_to_instantiate=search_attr,
+                #                                                         search_attributes=searchable_attr)
+                if cache_found_flag == True:
+                    found_facts.append(results[0])
+                    self.write_trace(
+                        f'{pcol.MAGENTA}found: cache{pcol.RESETALL}')
+            # if not found_facts:
+            #     self.write_trace('found:>>> cache')
+        if not cache_found_flag and prop_string in self.property_refs:
+            # search for data for each property reference source
+            for propid_label, _source_name in list(self.property_refs[prop_string]):
+                self.last_heartbeat = time.time()
+
+                try:
+                    if _source_name == source_name:
+                        search_alist.set(tt.PROPERTY, propid_label[0])
+                        facts = None
+                        if search_attr == tt.OBJECT:
+                            facts = self.temporal_sibling_facts(
+                                alist, search_alist, source_name, source)
+                        if facts is None:
+                            facts = negative_lookups.find_property_values(
+                                source_name, source['fn'], search_alist, search_attr)
+                        found_facts.extend(facts)
+                        # TODO: handle location search in less adhoc manner
+                        if alist.get(tt.PROPERTY).lower() == "location":
+                            if search_attr == tt.SUBJECT:
+                                found_facts.extend(
+                                    wikidata.part_of_relation_subject(search_alist))
+                            elif search_attr == tt.OBJECT:
+                                found_facts.extend(
+                                    wikidata.part_of_relation_object(search_alist))
+                        break
+                except Exception as ex:
+                    self.write_trace(
+                        f"{pcol.RED}Search Error{pcol.RESETALL}", processLog.LogLevel.ERROR)
+                    print(str(ex))
+        if not found_facts and alist.get(tt.PROPERTY).startswith('__geopolitical:'):
+            if search_attr == tt.SUBJECT:
+                found_facts.extend(
+                    wikidata.part_of_geopolitical_subject(search_alist))
+        # TODO: save facts found to cache if caching is enabled
+        # if foundFacts and config.config['use_cache']:
+        #     for ff in foundFacts:
+        #         cache().save(ff, ff.dataSources[0])
+        return [(ff, search_attr) for ff in found_facts]
+
+    def temporal_sibling_facts(self, alist: Alist, search_alist: Alist, source_name: str, source: dict):
+        """ Look up the object of an alist together with its temporal siblings.
+
+        Args
+        ----
+        alist : Alist
+            The alist being searched, as stored in the inference graph.
+
+        search_alist : Alist
+            Copy of the alist with the source-specific property and retrieval context.
+
+        source_name : str
+
+        source : dict
+            The KB module (`fn`) and its `trust` level.
+
+        Return
+        ------
+        A list of fact alists for the time of the alist, or None if the 
+        source or alist does not support a batch lookup.
+
+        Notes
+        -----
+        Siblings are the alists with the same parent that differ only in 
+        their explicit time, e.g. the children of a temporal decomposition. 
+        The first sibling searched fetches the values for the whole set 
+        with `find_property_object_batch`; the others wait for and read 
+        the `prefetched` table. Years known to have no data are left out 
+        of the set, and years the batch finds no data for are added to 
+        the negative cache. If the batch lookup fails, the entry is 
+        dropped and None is returned to the fetcher and the waiters.
+        """
+        if not hasattr(source['fn'], 'find_property_object_batch'):
+            return None
+        year = str(alist.get(tt.TIME)).replace(".0", "")
+        context = search_alist.get(tt.CONTEXT)
+        context = {**context[0], **context[1], **context[2]} if context else {}
+        if not utils.is_numeric(year) or tt.TIME in context:
+            return None
+
+        def year_alist(y):
+            year_search_alist = search_alist.copy()
+            year_search_alist.set(tt.TIME, y)
+            return year_search_alist
+
+        if negative_lookups.is_empty(source_name, year_alist(year), tt.OBJECT):
+            return []
+        key = (source_name, search_alist.instantiation_value(tt.SUBJECT),
+               search_alist.get(tt.PROPERTY))
+        fetch = False
+        with self.prefetch_lock:
+            entry = self.prefetched.get(key)
+            if entry is None or year not in entry['times']:
+                siblings = [y for y in self.temporal_siblings(alist)
+                            if not negative_lookups.is_empty(source_name, year_alist(y), tt.OBJECT)]
+                if not siblings:
+                    return None
+                entry = {'times': set([year] + siblings), 'facts': {},
+                         'done': threading.Event()}
+                self.prefetched[key] = entry
+                fetch = True
+        if fetch:
+            facts = None
+            try:
+                facts = source['fn'].find_property_object_batch(
+                    search_alist, sorted(entry['times']))
+            except Exception as ex:
+                self.write_trace(
+                    f"{pcol.RED}batch lookup failed{pcol.RESET} {source_name}: {str(ex)}{pcol.RESETALL}",
+                    processLog.LogLevel.WARNING)
+            if facts is None:
+                entry['failed'] = True
+                with self.prefetch_lock:
+                    if self.prefetched.get(key) is entry:
+                        del self.prefetched[key]
+            else:
+                entry['facts'] = facts
+                for y in entry['times']:
+                    if not facts.get(y):
+                        negative_lookups.record(source_name, year_alist(y), tt.OBJECT)
+            entry['done'].set()
+        elif not entry['done'].wait(config.config['kb_search_timeout']):
+            return None
+        if entry.get('failed'):
+            # the siblings fall back to their own lookups
+            return None
+
+        facts = []
+        for fact in entry['facts'].get(year, []):
+            data_alist = search_alist.copy()
+            data_alist.set(tt.OBJECT, fact.get(tt.OBJECT))
+            data_alist.set(tt.TIME, fact.get(tt.TIME))
+            data_alist.data_sources = list(
+                set(data_alist.data_sources + fact.data_sources))
+            facts.append(data_alist)
+        return facts
+
+    def temporal_siblings(self, alist: Alist):
+        """ Times of the unresolved siblings of an alist that differ from it only in time """
+        times = []
+        for parent_id in self.G.parent_ids(alist.id):
+            for x in self.G.child_alists(parent_id):
+                if x.id == alist.id or x.state not in [states.UNEXPLORED, states.EXPLORING]:
+                    continue
+                if x.get(tt.OP) == alist.get(tt.OP) and \
+                        x.instantiation_value(tt.SUBJECT) == alist.instantiation_value(tt.SUBJECT) and \
+                        x.get(tt.PROPERTY) == alist.get(tt.PROPERTY) and \
+                        x.get(tt.OBJECT) == alist.get(tt.OBJECT):
+                    t = str(x.get(tt.TIME)).replace(".0", "")
+                    if utils.is_numeric(t) and t not in times:
+                        times.append(t)
+        return times
+
     def get_map_strategy(self, alist: Alist):
         """ Get decomposition rules to apply to an alist
 
@@ -425,13 +860,14 @@ class Infer:
         if alist.depth + 1 > config.config['max_depth']:
             print('max depth reached!\n')
             alist.state = states.IGNORE
+            self.release_exhausted()
             return alist
 
         self.write_trace('{blue}{bold}T{thread}{reset} > {op}:{id}-{alist}{resetall}'.format(
             blue=pcol.BLUE, reset=pcol.RESET, bold=pcol.RESET, resetall=pcol.RESETALL,
             thread=threading.get_ident(),
             op=map_op[1], alist=alist, id=alist.id))
-        alist.branchType = br.OR
+        alist.branch_type = br.OR
         child = map_op[0](alist, self.G)
         # check for query context
         context = alist.get(tt.CONTEXT)
@@ -470,11 +906,16 @@ class Infer:
 
         Return
         --------
-        Returns True if aggregation was successful.  
+        Returns True if aggregation was successful and changed the 
+        instantiation of the alist.
 
         Notes
         -----
         Only child alists that are in the `reduced` or `reducible` states are aggregated.
+        Operations with incremental reducers (`accumulate` and `finalize`) only 
+        fold in the children that became reducible since the last aggregation. 
+        If a child folded in before has been pruned or left the reducible 
+        states since, the state is rebuilt from the current children.
         The result of the aggregation is stored in the alist and the inference graph is updated.
         Text explaining the aggregation is also added to the `xp` attribute of the alist.
         """
@@ -496,15 +937,36 @@ class Infer:
                       if (x.state == states.REDUCIBLE or x.state == states.REDUCED)
                       and x.get(tt.OP).lower() != 'comp']
         for x in reducibles:
-            self.write_trace(
-                f'  {pcol.YELLOW}<<< {x.id}{pcol.RESET}-{x}{pcol.RESETALL}')
+            if x.state == states.REDUCIBLE:
+                self.write_trace(
+                    f'  {pcol.YELLOW}<<< {x.id}{pcol.RESET}-{x}{pcol.RESETALL}')
 
         unexplored = [
             x for x in children if x.state == states.UNEXPLORED]
         if not reducibles or len(unexplored) == len(children):
             return False  # there's nothing to reduce
 
-        reducedAlist = reduce_op.reduce(alist, reducibles, self.G)
+        was_reduced = alist.state in [states.REDUCIBLE, states.REDUCED] and \
+            alist.get(tt.OP).lower() != 'comp'
+        last_output = self.reduced_output(alist)
+        if hasattr(reduce_op, 'accumulate'):
+            # fold only the children that are new or changed since the last reduce
+            reduce_state = self.reduce_states.setdefault(alist.id, {})
+            folded = reduce_state.setdefault('folded', set())
+            if folded - set(x.id for x in reducibles):
+                # a folded child was pruned or is no longer reducible, so 
+                # rebuild the state from the current children
+                reduce_state.clear()
+                folded = reduce_state['folded'] = set()
+            for x in reducibles:
+                if x.state == states.REDUCIBLE or x.id not in folded:
+                    reduce_op.accumulate(reduce_state, alist, x)
+                    folded.add(x.id)
+            reducedAlist = reduce_op.finalize(reduce_state, alist, self.G)
+        else:
+            reducedAlist = reduce_op.reduce(alist, reducibles, self.G)
+        if reducedAlist is None or alist.state == states.IGNORE:
+            self.release_exhausted()
 
         last_heartbeat = time.time()
 
@@ -513,11 +975,19 @@ class Infer:
                 alist.data_sources = list(
                     set(alist.data_sources + c.data_sources))
             for r in reducibles:
-                r.state = states.REDUCED
-                self.G.add_alist(r)
+                if r.state != states.REDUCED:
+                    r.state = states.REDUCED
+                    self.G.add_alist(r)
+            if was_reduced and self.reduced_output(alist) == last_output:
+                # nothing new to propagate to the ancestors
+                self.G.add_alist(alist)
+                self.write_trace(
+                    f"{pcol.GREEN}reduced {alist.id} unchanged{pcol.RESETALL}")
+                return False
             alist.state = states.REDUCIBLE  # check later
             self.G.add_alist(alist)
             self.explainer.what(self.G, alist, True)
+            self.resolve_subgoal(alist)
             self.write_trace(
                 f"{pcol.GREEN}reduced {alist.id}{pcol.RESET}-{alist}{pcol.RESETALL}")
             return True
@@ -527,6 +997,24 @@ class Infer:
                 f"{pcol.YELLOW}reduce {alist.id} failed {pcol.RESET}-{alist}{pcol.RESETALL}")
             return False
 
+    def forget_pruned(self, alist_ids: list):
+        """ Drop the reduce state of alists pruned from the graph and release 
+        the alists that were waiting on them to resolve a sub-goal.
+        """
+        for alist_id in alist_ids:
+            self.reduce_states.pop(alist_id, None)
+        self.release_exhausted()
+
+    def reduced_output(self, alist: Alist):
+        """ Values of the aggregation and projection variables and the 
+            uncertainty of an alist, to detect when a reduce changes nothing. 
+        """
+        opvars = alist.get(tt.OPVAR).split(' ')
+        projVars = alist.projection_variables() or {}
+        return str([[alist.instantiation_value(v) for v in opvars],
+                    [alist.instantiation_value(p) for p in projVars],
+                    alist.get(tt.COV)])
+
     def propagate(self, alist_id):
         self.last_heartbeat = time.time()
         curr_alist = self.G.alist(alist_id)
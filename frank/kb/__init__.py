@@ -2,12 +2,12 @@ from functools import wraps
 from typing import Any, Union, Optional
 from collections.abc import Callable
 from abc import ABC, abstractmethod
-from os import path, makedirs
-import pickle
 import hashlib
+from frank import config
+from frank.kb.utils.cache import DiskCache, cache_directory
 
-DATA_DIRECTORY = path.join(path.dirname(path.abspath(__file__)), '../data/kb')
-makedirs(DATA_DIRECTORY, exist_ok=True)
+# results of the methods memoized with KB.memoize
+memo_cache = DiskCache(cache_directory('kb'), config.config['kb_memoize_ttl'])
 
 
 class KB:
@@ -28,17 +28,13 @@ class KB:
                 if key:
                     keys.append(key)
 
-                filename = '_'.join(keys)
-                filepath = path.join(DATA_DIRECTORY, filename)
-
-                if (path.exists(filepath)):
-                    with open(filepath, 'rb') as f:
-                        return pickle.load(f)
-                else:
-                    result = func(self, *args, **kwargs)
-                    with open(filepath, 'wb') as f:
-                        pickle.dump(result, f)
-                    return result
+                cache_key = '_'.join(keys)
+                entry = memo_cache.get_entry(cache_key)
+                if entry is not None:
+                    return entry[1]
+                result = func(self, *args, **kwargs)
+                memo_cache.put(cache_key, result)
+                return result
 
             return wrapper
         return decorator
@@ -5,7 +5,7 @@ Description: Interface to the ConceptNet KB.
 
 '''
 
-import requests
+from frank.kb.utils.requests import requests
 import urllib.parse
 from frank.alist import Alist
 from frank.alist import Attributes as tt
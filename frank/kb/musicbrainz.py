@@ -5,13 +5,18 @@ Description: Basic wrapper for the MusicBrainz API.
 
 '''
 
-import requests
+from frank.kb.utils.requests import requests
+from frank.kb.utils.cache import DiskCache, cache_directory, memoize
 from datetime import datetime
 import urllib.parse
 from frank.alist import Alist
 from frank.alist import Attributes as tt
 from frank import config
 
+# results of recording searches
+recording_cache = DiskCache(cache_directory('musicbrainz_recordings'),
+                            config.config['musicbrainz_ttl'])
+
 #format : artist sang/recorded title in date
 
 def search_properties(search_term):
@@ -46,6 +51,8 @@ def find_property_subject(alist: Alist):
                 artist=None,
                 title=alist.get(tt.OBJECT),
                 date=alist.get(tt.TIME))
+    if results is None:
+        return None
     for item in results:
         data_alist = alist.copy()
         data_alist.set(tt.SUBJECT, item['artist'])
@@ -62,6 +69,8 @@ def find_property_object(alist: Alist):
                 artist=alist.get(tt.SUBJECT),
                 title=None,        
                 date=alist.get(tt.TIME))
+    if results is None:
+        return None
 
     for item in results:
         data_alist = alist.copy()
@@ -79,6 +88,8 @@ def find_propert_time(alist: Alist):
                 artist=alist.get(tt.SUBJECT),
                 title=alist.get(tt.OBJECT),
                 date=None)
+    if results is None:
+        return None
     
     # parse date formats and sort in reverse
     FORMATS = ['%Y', '%Y-%m-%d']
@@ -113,7 +124,12 @@ def find_recording(title=None, artist=None, date=None):
         query += (' AND ' if len(query) > 0 else '' ) + f'artist:"{artist}"'
     if date is not None:
         query += (' AND ' if len(query) > 0 else '' ) + f'date:"{date}"'
-    
+    return search_recordings(query)
+
+
+@memoize(recording_cache)
+def search_recordings(query: str):
+    ''' Returns the best scoring recordings of a search; None if the search failed '''
     results = []
     try:
         response = requests.get(
@@ -143,5 +159,6 @@ def find_recording(title=None, artist=None, date=None):
                 # print(f"{item['title']} / {item['first-release-date']} / {item['artist-credit'][0]['name']} / item['score']")
     except Exception as ex:
         print("musicbrainz query error: " + str(ex))
+        return None
     return results
 
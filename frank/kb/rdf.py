@@ -5,7 +5,7 @@ Description: Interface to various SPARQL-based endpoints.
 
 '''
 
-import requests
+from frank.kb.utils.requests import requests
 import urllib.parse
 from frank.alist import Alist
 from frank.alist import Attributes as tt
@@ -0,0 +1,367 @@
+'''
+File: triplestore.py
+Description: Local store of Wikidata triples, searched before the remote knowledge bases.
+
+Usage: python -m frank.kb.triplestore ingest <nt file> [<nt file> ...]
+
+The N-Triples files are slices of the Wikidata truthy dump (latest-truthy.nt),
+e.g. filtered to the properties of interest with grep. The direct claims
+(wdt:) of entities and their English labels are kept. Terms are encoded
+as integers in sorted order, and the triples are kept sorted in three
+orders, SPO, POS and OSP, with each column in its own .npy file that is
+memory-mapped on load.
+'''
+
+import os
+import re
+import json
+import uuid
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from frank.alist import Alist
+from frank.alist import Attributes as tt
+from frank import config
+from frank.kb.utils.property_index import PropertyIndex
+import frank.util.utils
+
+META_FILE = 'meta.json'
+ENTITY_URI = 'http://www.wikidata.org/entity/'
+DIRECT_URI = 'http://www.wikidata.org/prop/direct/'
+LABEL_URIS = ('http://www.w3.org/2000/01/rdf-schema#label',
+              'http://schema.org/name',
+              'http://www.w3.org/2004/02/skos/core#prefLabel')
+LABEL = 'label'
+# literal terms are prefixed to keep them apart from entity and property ids
+LITERAL = '"'
+# column order of each index
+ORDERS = {'spo': (0, 1, 2), 'pos': (1, 2, 0), 'osp': (2, 0, 1)}
+
+TRIPLE_PATTERN = re.compile(r'^<([^>]*)>\s+<([^>]*)>\s+(.*?)\s*\.\s*$')
+LITERAL_PATTERN = re.compile(
+    r'^"((?:[^"\\]|\\.)*)"(?:@([A-Za-z0-9-]+)|\^\^<[^>]*>)?$')
+ESCAPE_PATTERN = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+ESCAPES = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f'}
+
+
+def store_directory():
+    return config.config['triplestore_dir'] or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'data', 'triplestore')
+
+
+class TripleStore():
+    ''' Integer-encoded triples with SPO, POS and OSP indexes.
+
+    Term ids follow the sorted order of the terms, so a term is found by
+    binary search over the term dictionary and the ids of terms sharing a
+    prefix (e.g. all properties) are contiguous.
+    '''
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(directory, self.meta['files'][name]),
+                           mmap_mode='r')
+        self.terms = load('terms')
+        self.offsets = load('offsets')
+        self.size = len(self.offsets) - 1
+        self.indexes = {order: [load(f'{order}.{i}') for i in range(3)]
+                        for order in ORDERS}
+        self.label_id = self.term_id(LABEL)
+        self.lock = threading.Lock()
+        self._property_index = None
+
+    def term(self, term_id: int):
+        return bytes(self.terms[self.offsets[term_id]:self.offsets[term_id + 1]]).decode('utf-8')
+
+    def _lower_bound(self, key: bytes):
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self.terms[self.offsets[mid]:self.offsets[mid + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def term_id(self, term: str):
+        ''' Id of a term or None '''
+        key = term.encode('utf-8')
+        i = self._lower_bound(key)
+        if i < self.size and bytes(self.terms[self.offsets[i]:self.offsets[i + 1]]) == key:
+            return i
+        return None
+
+    def prefix_range(self, prefix: str):
+        ''' The range of ids of the terms starting with the prefix '''
+        key = prefix.encode('utf-8')
+        end = key[:-1] + bytes([key[-1] + 1]) if key and key[-1] < 255 else None
+        return (self._lower_bound(key),
+                self._lower_bound(end) if end is not None else self.size)
+
+    def triples(self, s=None, p=None, o=None):
+        ''' The (s, p, o) ids of the triples matching the given ids,
+        found in the index whose leading columns are the given ones.
+        '''
+        bound = (s, p, o)
+        best, best_len = 'spo', -1
+        for order, columns in ORDERS.items():
+            n = 0
+            while n < 3 and bound[columns[n]] is not None:
+                n += 1
+            if n > best_len:
+                best, best_len = order, n
+        columns = ORDERS[best]
+        index = self.indexes[best]
+        lo, hi = 0, len(index[0])
+        for i in range(best_len):
+            values = index[i][lo:hi]
+            value = bound[columns[i]]
+            lo, hi = lo + int(np.searchsorted(values, value, 'left')), \
+                lo + int(np.searchsorted(values, value, 'right'))
+        result = np.empty((hi - lo, 3), dtype=np.int64)
+        for i, column in enumerate(columns):
+            result[:, column] = index[i][lo:hi]
+        return result
+
+    def count(self, s=None, p=None, o=None):
+        return len(self.triples(s, p, o))
+
+    def label(self, term_id: int):
+        ''' English label of an entity, or the term itself '''
+        term = self.term(term_id)
+        if term.startswith(LITERAL):
+            return term[len(LITERAL):]
+        if self.label_id is not None:
+            labels = self.triples(s=term_id, p=self.label_id)
+            if len(labels):
+                return self.term(labels[0][2])[len(LITERAL):]
+        return term
+
+    def entities(self, name: str):
+        ''' Ids of the entities labelled with the name, those with the most
+        claims first.
+        '''
+        if self.label_id is None:
+            return []
+        found = []
+        for text in dict.fromkeys([name, name[:1].upper() + name[1:]]):
+            literal_id = self.term_id(LITERAL + text)
+            if literal_id is not None:
+                found.extend(int(x) for x in
+                             self.triples(p=self.label_id, o=literal_id)[:, 0])
+        found = list(dict.fromkeys(found))
+        found.sort(key=lambda x: -self.count(s=x))
+        return found
+
+    def property_index(self):
+        ''' Index of the labels of the properties in the store '''
+        with self.lock:
+            if self._property_index is None:
+                lo, hi = self.prefix_range('P')
+                spo = self.indexes['spo']
+                start = int(np.searchsorted(spo[0], lo, 'left'))
+                end = int(np.searchsorted(spo[0], hi, 'left'))
+                is_label = np.asarray(spo[1][start:end]) == self.label_id
+                subjects = np.asarray(spo[0][start:end])[is_label]
+                objects = np.asarray(spo[2][start:end])[is_label]
+                self._property_index = PropertyIndex(pd.DataFrame({
+                    'id': [self.term(x) for x in subjects],
+                    'label': [self.term(x)[len(LITERAL):] for x in objects]}))
+            return self._property_index
+
+
+lock = threading.Lock()
+loaded = {}
+
+
+def store():
+    ''' The triple store, reloaded when it has been rebuilt; None if there is none '''
+    directory = store_directory()
+    try:
+        mtime = os.stat(os.path.join(directory, META_FILE)).st_mtime_ns
+    except OSError:
+        return None
+    with lock:
+        entry = loaded.get(directory)
+        if entry is None or entry[0] != mtime:
+            try:
+                entry = (mtime, TripleStore(directory))
+            except (OSError, ValueError, KeyError) as ex:
+                print("triple store error: " + str(ex))
+                return None
+            loaded[directory] = entry
+        return entry[1]
+
+
+def available():
+    return store() is not None
+
+
+def search_properties(search_term):
+    ts = store()
+    if ts is None or ts.label_id is None:
+        return []
+    return ts.property_index().search(search_term, threshold=0.8, limit=1)
+
+
+def find_property_values(alist: Alist, search_element: str):
+    if not alist.get(tt.PROPERTY):
+        return []
+    ts = store()
+    if ts is None:
+        return []
+    property_id = ts.term_id(alist.get(tt.PROPERTY))
+    if property_id is None:
+        return []
+    # the truthy claims carry no dates, so they only answer alists whose
+    # time, if any, was injected from the context
+    ctx = alist.get(tt.CONTEXT)
+    ctx = {**ctx[0], **ctx[1], **ctx[2]} if ctx else {}
+    if alist.get(tt.TIME) and tt.TIME not in ctx:
+        return []
+
+    if search_element == tt.SUBJECT:
+        values = []
+        for entity_id in find_entities(ts, alist.instantiation_value(tt.OBJECT)):
+            values = [ts.label(x) for x in ts.triples(p=property_id, o=entity_id)[:, 0]]
+            if values:
+                break
+    elif search_element == tt.OBJECT:
+        values = []
+        for entity_id in find_entities(ts, alist.instantiation_value(tt.SUBJECT)):
+            values = [ts.label(x) for x in ts.triples(s=entity_id, p=property_id)[:, 2]]
+            if values:
+                break
+    else:
+        return []
+
+    alist_arr = []
+    for value in values:
+        # numeric values may be out of date for the time in the context
+        if alist.get(tt.TIME) and frank.util.utils.is_numeric(value):
+            continue
+        data_alist = alist.copy()
+        data_alist.set(search_element, value)
+        data_alist.data_sources = list(
+            set(data_alist.data_sources + ['wikidata']))
+        alist_arr.append(data_alist)
+    return alist_arr
+
+
+def find_entities(ts: TripleStore, entity_name):
+    if not isinstance(entity_name, str) or not entity_name.strip():
+        return []
+    if entity_name.startswith(ENTITY_URI):
+        entity_id = ts.term_id(entity_name[len(ENTITY_URI):])
+        return [entity_id] if entity_id is not None else []
+    return ts.entities(entity_name)
+
+
+def unescape(text: str):
+    def replace(m):
+        c = m.group(1)
+        if c[0] in 'uU' and len(c) > 1:
+            return chr(int(c[1:], 16))
+        return ESCAPES.get(c, c)
+    return ESCAPE_PATTERN.sub(replace, text)
+
+
+def parse_term(text: str):
+    ''' Encode an N-Triples object as a store term, or None to skip it '''
+    if text.startswith('<'):
+        uri = text[1:-1]
+        if uri.startswith(ENTITY_URI):
+            return uri[len(ENTITY_URI):]
+        return LITERAL + uri
+    m = LITERAL_PATTERN.match(text)
+    if not m:
+        return None
+    return LITERAL + unescape(m.group(1)), m.group(2)
+
+
+def read_triples(nt_path: str):
+    ''' Yield the (subject, predicate, object) terms kept from an N-Triples file '''
+    with open(nt_path, encoding='utf-8') as f:
+        for line in f:
+            m = TRIPLE_PATTERN.match(line)
+            if not m or not m.group(1).startswith(ENTITY_URI):
+                continue
+            subject = m.group(1)[len(ENTITY_URI):]
+            predicate = m.group(2)
+            term = parse_term(m.group(3))
+            if term is None:
+                continue
+            if predicate in LABEL_URIS:
+                if isinstance(term, tuple) and term[1] == 'en':
+                    yield (subject, LABEL, term[0])
+            elif predicate.startswith(DIRECT_URI):
+                if isinstance(term, tuple):
+                    term = term[0]
+                yield (subject, predicate[len(DIRECT_URI):], term)
+
+
+def ingest(nt_paths: list, directory=None):
+    ''' Build the store from N-Triples files, replacing the previous one.
+    New files are written under a new version before meta.json is
+    replaced, so readers never see a partly written store.
+    '''
+    directory = directory or store_directory()
+    triples = set()
+    for nt_path in nt_paths:
+        triples.update(read_triples(nt_path))
+    terms = sorted({t for triple in triples for t in triple})
+    ids = {t: i for i, t in enumerate(terms)}
+    encoded = np.array([[ids[s], ids[p], ids[o]] for s, p, o in triples],
+                       dtype=np.int32).reshape(-1, 3)
+    blobs = [t.encode('utf-8') for t in terms]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+
+    os.makedirs(directory, exist_ok=True)
+    version = uuid.uuid4().hex[:8]
+    files = {'terms': f'terms.{version}.npy', 'offsets': f'offsets.{version}.npy'}
+    np.save(os.path.join(directory, files['terms']),
+            np.frombuffer(b''.join(blobs), dtype=np.uint8))
+    np.save(os.path.join(directory, files['offsets']), offsets)
+    for order, columns in ORDERS.items():
+        # lexsort sorts by the last key first
+        ordered = encoded[np.lexsort([encoded[:, c] for c in reversed(columns)])]
+        for i, c in enumerate(columns):
+            files[f'{order}.{i}'] = f'{order}.{i}.{version}.npy'
+            np.save(os.path.join(directory, files[f'{order}.{i}']),
+                    np.ascontiguousarray(ordered[:, c]))
+
+    meta_path = os.path.join(directory, META_FILE)
+    old_files = set()
+    if os.path.isfile(meta_path):
+        with open(meta_path) as f:
+            old_files = set(json.load(f)['files'].values())
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': version, 'triples': len(encoded),
+                   'terms': len(terms), 'files': files}, f)
+    os.replace(tmp_path, meta_path)
+    # open memory maps of the old files stay valid after they are removed
+    for name in old_files - set(files.values()):
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+    return len(encoded)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        prog="python -m frank.kb.triplestore",
+        description="Build the local store of Wikidata triples")
+    argparser.add_argument("command", choices=["ingest"],
+        help="ingest: build the store from Wikidata truthy N-Triples files")
+    argparser.add_argument("files", nargs="+", help="N-Triples files")
+    args = argparser.parse_args()
+    n = ingest(args.files)
+    print(f"{n} triples -> {store_directory()}")
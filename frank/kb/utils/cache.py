@@ -0,0 +1,348 @@
+'''
+File: cache.py
+Description: Time-limited stores for data fetched from knowledge bases.
+
+
+'''
+
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import Future
+from frank import config
+from frank.alist import Attributes as tt
+
+
+def cache_directory(name: str):
+    ''' Directory of the on-disk tier of the named store '''
+    directory = config.config['kb_cache_dir'] or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        'data', 'kb_cache')
+    return os.path.join(directory, name)
+
+
+class DiskCache():
+    ''' Key-value cache on disk, split by key hash into sqlite shards.
+
+    Each shard is a sqlite database with its own lock, so writers of
+    different shards do not wait for each other, and each put is a single
+    transaction, so readers, in this or other processes, never see a
+    partial entry. Entries expire `ttl` seconds after they are put (never
+    if the ttl is 0). Once a shard grows past its part of `max_bytes`, the
+    least recently read entries are evicted. Values are pickled.
+    '''
+
+    def __init__(self, directory: str, ttl=0, shards=None, max_bytes=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.shards = shards or config.config['disk_cache_shards']
+        max_bytes = max_bytes or config.config['disk_cache_max_bytes']
+        self.shard_bytes = max_bytes / self.shards
+        self.connections = [None] * self.shards
+        self.locks = [threading.Lock() for _ in range(self.shards)]
+        self.sizes = [None] * self.shards
+        self.counters = [dict.fromkeys(['hits', 'misses', 'puts', 'expired', 'evictions'], 0)
+                         for _ in range(self.shards)]
+
+    def _shard(self, key: str):
+        return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % self.shards
+
+    def _connection(self, shard: int):
+        # called with the shard lock held
+        conn = self.connections[shard]
+        if conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, f'{shard}.sqlite'),
+                                   timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                                    key TEXT PRIMARY KEY, value BLOB, expires REAL,
+                                    accessed REAL, size INTEGER)''')
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self.connections[shard] = conn
+        return conn
+
+    def get_entry(self, key: str):
+        ''' Get the (expiry time, value) of an unexpired entry or None '''
+        shard = self._shard(key)
+        now = time.time()
+        with self.locks[shard]:
+            counters = self.counters[shard]
+            try:
+                conn = self._connection(shard)
+                row = conn.execute('SELECT value, expires, accessed FROM entries WHERE key=?',
+                                   (key,)).fetchone()
+                if row is None:
+                    counters['misses'] += 1
+                    return None
+                value, expires, accessed = row
+                if expires is not None and expires <= now:
+                    with conn:
+                        conn.execute('BEGIN IMMEDIATE')
+                        row = conn.execute('SELECT size FROM entries WHERE key=?',
+                                           (key,)).fetchone()
+                        conn.execute('DELETE FROM entries WHERE key=?', (key,))
+                    if row is not None and self.sizes[shard] is not None:
+                        self.sizes[shard] -= row[0] or 0
+                    counters['expired'] += 1
+                    counters['misses'] += 1
+                    return None
+                # the read time only orders evictions, so it is not saved on every read
+                if now - accessed > 1:
+                    with conn:
+                        conn.execute('UPDATE entries SET accessed=? WHERE key=?', (now, key))
+                counters['hits'] += 1
+            except sqlite3.Error as ex:
+                print(f"Error reading cache {self.directory}: {str(ex)}")
+                counters['misses'] += 1
+                return None
+        try:
+            return (expires if expires is not None else float('inf'), pickle.loads(value))
+        except Exception:
+            return None
+
+    def get(self, key: str, default=None):
+        ''' Get the value of an unexpired entry or the default '''
+        entry = self.get_entry(key)
+        return entry[1] if entry is not None else default
+
+    def put(self, key: str, value, ttl=None):
+        ''' Save a value, evicting the least recently read entries of its
+        shard if the shard is full.
+        '''
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        shard = self._shard(key)
+        with self.locks[shard]:
+            try:
+                conn = self._connection(shard)
+                with conn:
+                    # read the size of the replaced entry in the same transaction
+                    conn.execute('BEGIN IMMEDIATE')
+                    row = conn.execute('SELECT size FROM entries WHERE key=?', (key,)).fetchone()
+                    conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                                 (key, blob, now + ttl if ttl else None, now, len(blob)))
+                self.counters[shard]['puts'] += 1
+                if self.sizes[shard] is None:
+                    self.sizes[shard] = conn.execute(
+                        'SELECT TOTAL(size) FROM entries').fetchone()[0]
+                else:
+                    self.sizes[shard] += len(blob) - ((row[0] or 0) if row else 0)
+                if self.sizes[shard] > self.shard_bytes:
+                    self._evict(shard, conn, now)
+            except sqlite3.Error as ex:
+                print(f"Error writing cache {self.directory}: {str(ex)}")
+
+    def _evict(self, shard: int, conn, now: float):
+        # called with the shard lock held; evicts down to 90% of the shard size
+        with conn:
+            expired = conn.execute('DELETE FROM entries WHERE expires <= ?', (now,)).rowcount
+            self.counters[shard]['expired'] += max(expired, 0)
+            size = conn.execute('SELECT TOTAL(size) FROM entries').fetchone()[0]
+            target = self.shard_bytes * 0.9
+            while size > target:
+                rows = conn.execute(
+                    'SELECT key, size FROM entries ORDER BY accessed LIMIT 64').fetchall()
+                if not rows:
+                    break
+                keys = []
+                for key, entry_size in rows:
+                    if size <= target:
+                        break
+                    keys.append((key,))
+                    size -= entry_size
+                conn.executemany('DELETE FROM entries WHERE key=?', keys)
+                self.counters[shard]['evictions'] += len(keys)
+        self.sizes[shard] = size
+
+    def delete(self, key: str):
+        shard = self._shard(key)
+        with self.locks[shard]:
+            try:
+                conn = self._connection(shard)
+                with conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    row = conn.execute('SELECT size FROM entries WHERE key=?', (key,)).fetchone()
+                    conn.execute('DELETE FROM entries WHERE key=?', (key,))
+                if row is not None and self.sizes[shard] is not None:
+                    self.sizes[shard] -= row[0] or 0
+            except sqlite3.Error as ex:
+                print(f"Error writing cache {self.directory}: {str(ex)}")
+
+    def clear(self):
+        ''' Drop all entries '''
+        for shard in range(self.shards):
+            with self.locks[shard]:
+                conn = self._connection(shard)
+                with conn:
+                    conn.execute('DELETE FROM entries')
+                self.sizes[shard] = 0
+
+    def stats(self):
+        ''' Hit, miss, put, expiry and eviction counts of this process '''
+        totals = {}
+        for shard in range(self.shards):
+            with self.locks[shard]:
+                for name, count in self.counters[shard].items():
+                    totals[name] = totals.get(name, 0) + count
+        return totals
+
+
+class TTLStore():
+    ''' Key-value store with an in-process tier and an optional on-disk tier.
+
+    Entries expire `ttl` seconds after they are put, unless put with their
+    own ttl. The in-process tier keeps at most `maxsize` entries, evicting
+    the least recently used; 0 means no limit. The on-disk tier is a
+    `DiskCache`, shared with other processes.
+    '''
+
+    def __init__(self, name: str, ttl: float, disk=True, maxsize=0):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.disk = DiskCache(cache_directory(name), ttl) if disk else None
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.loading = {}
+
+    def get(self, key: str, default=None):
+        ''' Get the value of an unexpired entry or the default '''
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+        if entry is not None:
+            if entry[0] > now:
+                return entry[1]
+            with self.lock:
+                self.memory.pop(key, None)
+        if self.disk is None:
+            return default
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return default
+        self._remember(key, entry[0], entry[1])
+        return entry[1]
+
+    def _remember(self, key, expires, value):
+        with self.lock:
+            self.memory[key] = (expires, value)
+            self.memory.move_to_end(key)
+            while self.maxsize > 0 and len(self.memory) > self.maxsize:
+                self.memory.popitem(last=False)
+
+    def put(self, key: str, value, ttl=None):
+        ''' Save a value in both tiers '''
+        ttl = self.ttl if ttl is None else ttl
+        self._remember(key, time.time() + ttl, value)
+        if self.disk is not None and ttl > 0:
+            self.disk.put(key, value, ttl)
+
+    def get_or_load(self, key: str, loader):
+        ''' Get the value of a key, calling loader() to fetch and put it on a miss.
+        Concurrent misses on the same key call the loader once and all get
+        its result, or its exception. A loader result of None is not cached.
+        '''
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.lock:
+            future = self.loading.get(key)
+            leader = future is None
+            if leader:
+                future = self.loading[key] = Future()
+        if leader:
+            try:
+                # another thread may have put the value before this one became the leader
+                value = self.get(key)
+                if value is None:
+                    value = loader()
+                    if value is not None:
+                        self.put(key, value)
+                future.set_result(value)
+            except Exception as ex:
+                future.set_exception(ex)
+            finally:
+                with self.lock:
+                    self.loading.pop(key, None)
+        return future.result()
+
+    def clear(self):
+        ''' Drop all entries in the in-process tier '''
+        with self.lock:
+            self.memory.clear()
+
+
+class NegativeCache(TTLStore):
+    ''' Lookups of knowledge base sources that found no data.
+
+    A lookup is keyed by the source, the searched attribute, the
+    property, subject, object and time of the alist, and whether the time
+    was injected from the context, which sources answer differently. A
+    lookup is only remembered as empty if the source returned an empty
+    list; sources return None when a lookup failed, so that an outage of
+    a source does not hide its data.
+    '''
+
+    def key(self, source_name: str, alist, search_element: str):
+        context = alist.get(tt.CONTEXT)
+        context = {**context[0], **context[1], **context[2]} if context else {}
+        return json.dumps([source_name, search_element, str(alist.get(tt.PROPERTY)),
+                           str(alist.instantiation_value(tt.SUBJECT)),
+                           str(alist.instantiation_value(tt.OBJECT)),
+                           str(alist.get(tt.TIME)), tt.TIME in context])
+
+    def is_empty(self, source_name: str, alist, search_element: str):
+        return self.get(self.key(source_name, alist, search_element)) is not None
+
+    def record(self, source_name: str, alist, search_element: str):
+        self.put(self.key(source_name, alist, search_element), True)
+
+    def find_property_values(self, source_name: str, source, alist, search_element: str):
+        ''' Look up the values of an alist in a source module, unless the
+        lookup is known to find nothing.
+        '''
+        if self.is_empty(source_name, alist, search_element):
+            return []
+        facts = source.find_property_values(alist, search_element)
+        if isinstance(facts, list) and not facts:
+            self.record(source_name, alist, search_element)
+        return facts or []
+
+
+# KB lookups that found no data, shared by the queries of this process
+negative_lookups = NegativeCache('kb_negative_lookups', config.config['kb_negative_ttl'],
+                                 disk=False, maxsize=config.config['kb_negative_cache_size'])
+
+
+def memoize(cache, key=None, ttl=None):
+    ''' Decorator caching the results of a function in a `DiskCache` or
+    `TTLStore`. The key of a call is key(*args, **kwargs) if given, or
+    the JSON of the function name and arguments. Results of None are not
+    cached.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key else json.dumps(
+                [func.__module__, func.__qualname__, args, kwargs], default=str)
+            value = cache.get(cache_key)
+            if value is None:
+                value = func(*args, **kwargs)
+                if value is not None:
+                    cache.put(cache_key, value, ttl)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+'''
+File: property_index.py
+Description: Character trigram index for fuzzy search of property labels.
+
+
+'''
+
+import os
+import difflib
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+import frank.dataloader
+
+
+class PropertyIndex():
+    ''' Trigram postings over the labels of a property table.
+
+    A search only scores, with difflib, the labels whose length allows a
+    score above the threshold and that share the most trigrams with the
+    search term relative to their length, instead of every label in the
+    table.
+    '''
+
+    def __init__(self, df: pd.DataFrame, max_candidates=64):
+        self.ids = [str(x) for x in df['id']]
+        self.labels = [str(x) for x in df['label']]
+        self.lengths = np.array([len(x) for x in self.labels])
+        self.max_candidates = max_candidates
+        postings = {}
+        for i, label in enumerate(self.labels):
+            for gram in trigrams(label):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {k: np.array(v, dtype=np.int32)
+                         for k, v in postings.items()}
+
+    def search(self, search_term: str, threshold=0.8, limit=1):
+        ''' Returns up to `limit` (id, label, score) tuples with a score above
+        the threshold, best first.
+        '''
+        search_term = str(search_term)
+        lists = [self.postings[g]
+                 for g in trigrams(search_term) if g in self.postings]
+        if not lists or not self.labels:
+            return []
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.labels))
+        # the score 2*matches/(len(a)+len(b)) is at most 2*min/(len(a)+len(b))
+        n = len(search_term)
+        ratio = (2 - threshold) / threshold if threshold > 0 else np.inf
+        candidates = np.nonzero((counts > 0) & (self.lengths * ratio >= n) &
+                                (self.lengths <= n * ratio))[0]
+        # rank like the ratio, 2*matches/(len(a)+len(b)), so that long 
+        # labels sharing many trigrams do not push out a short close match
+        scores = 2 * counts[candidates] / (self.lengths[candidates] + n)
+        candidates = candidates[np.argsort(-scores, kind='stable')
+                                [:self.max_candidates]]
+        results = []
+        matcher = difflib.SequenceMatcher(None, search_term)
+        for i in candidates:
+            matcher.set_seq2(self.labels[i])
+            # quick_ratio is an upper bound of ratio and cheaper to compute
+            if matcher.quick_ratio() <= threshold:
+                continue
+            score = matcher.ratio()
+            if score > threshold:
+                results.append((self.ids[i], self.labels[i], score))
+        results.sort(key=lambda x: x[2], reverse=True)
+        return results[:limit]
+
+
+def trigrams(text: str):
+    padded = f'  {text.lower()} '
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def index_path(filename: str):
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))), 'data', filename + '.index.pickle')
+
+
+lock = threading.Lock()
+indexes = {}
+
+
+def load_index(filename: str, load_df):
+    ''' Get the index of a property table, loading it from next to the table's
+    pickle, or building and saving it if the table has changed since.
+    The index is keyed on the version of the table's file, and the table is
+    only loaded with `load_df` when the index has to be rebuilt.
+    '''
+    version = frank.dataloader.file_version(frank.dataloader.dataset_file(filename))
+    with lock:
+        if filename in indexes and indexes[filename][0] == version:
+            return indexes[filename][1]
+        path = index_path(filename)
+        index = None
+        try:
+            with open(path, 'rb') as f:
+                saved_version, saved_index = pickle.load(f)
+            if saved_version == version:
+                index = saved_index
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError,
+                TypeError, ValueError):
+            index = None
+        if index is None:
+            index = PropertyIndex(load_df())
+            try:
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump((version, index), f)
+                os.replace(tmp_path, path)
+            except OSError as ex:
+                print(f"Error saving property index: {str(ex)}")
+        indexes[filename] = (version, index)
+        return index
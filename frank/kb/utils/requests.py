@@ -1,9 +1,224 @@
-from requests import Session
+'''
+File: requests.py
+Description: Shared HTTP client for the knowledge base adapters.
+
+
+'''
+
+import time
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+from requests import Session, Request
+from requests.exceptions import Timeout
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from frank.config import config
 
 
-session = Session()
-session.headers['user-agent'] = config['user-agent']
+class HostLimiter():
+    ''' Pacing of the requests to a host with a token bucket and a limit on
+    the requests in flight.
+
+    Both adapt by AIMD: each successful request raises the limit by
+    1/limit and the rate by 1/rate requests per second, up to their
+    maximums, so each grows by about one per round of requests. A 429 or
+    503 response, a failed request, or a latency above
+    `http_latency_tolerance` times the moving average halves the limit,
+    and the rate as well for 429 and 503 responses, at most once per
+    second.
+    A Retry-After header pauses the host for that long, up to
+    `http_max_pause` seconds.
+    '''
+
+    def __init__(self, rate: float, concurrency: int):
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.tokens = 1.0
+        self.max_limit = float(concurrency)
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self.refilled = time.time()
+        self.paused_until = 0
+        self.decreased = 0
+        self.latency = None
+        self.condition = threading.Condition()
+
+    def _refill(self, now: float):
+        # the bucket holds at most one second of requests
+        self.tokens = min(max(self.rate, 1.0),
+                          self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def acquire(self, timeout=None):
+        ''' Wait for a token and a free slot, raising Timeout if there is
+        none within `timeout` seconds.
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while True:
+                now = time.time()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1 and \
+                        self.in_flight < max(1, int(self.limit)):
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                if deadline is not None and now >= deadline:
+                    raise Timeout('Timed out waiting for a request slot')
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate, 0)
+                if deadline is not None:
+                    wait = min(wait, deadline - now) if wait > 0 else deadline - now
+                # a full host waits for a release
+                self.condition.wait(wait if wait > 0 else None)
+
+    def release(self, status, latency: float, retry_after=None):
+        ''' Free a slot and adapt to the outcome of the request; a status of
+        None is a failed request.
+        '''
+        with self.condition:
+            self.in_flight -= 1
+            now = time.time()
+            throttled = status in (429, 503)
+            if status is not None and not throttled:
+                congested = self.latency is not None and latency - self.latency > 0.1 \
+                    and latency > self.latency * config['http_latency_tolerance']
+                self.latency = latency if self.latency is None \
+                    else 0.9 * self.latency + 0.1 * latency
+            else:
+                congested = True
+            if congested:
+                if now - self.decreased >= 1:
+                    self.decreased = now
+                    self.limit = max(1.0, self.limit / 2)
+                    if throttled:
+                        self.rate = max(self.max_rate / 100, self.rate / 2)
+                        self.tokens = min(self.tokens, 0)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+            if throttled and retry_after:
+                try:
+                    self.paused_until = max(self.paused_until, now + min(
+                        float(retry_after), config['http_max_pause']))
+                except ValueError:
+                    pass
+            self.condition.notify_all()
+
+
+class Client():
+    ''' HTTP client with a keep-alive session per host.
+
+    Requests get a default timeout and are retried with exponential backoff
+    on connection errors and 5xx responses. The requests to each host are
+    paced by a `HostLimiter`; 429 and 503 responses are retried once it
+    lets them through again.
+    Identical GET and HEAD requests made while one is in flight share its
+    response instead of being sent again.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.host_limits = {}
+        self.inflight = {}
+        self.coalesced = 0
+
+    def session(self, host: str):
+        ''' Get the pooled session for a host, creating it on first use '''
+        with self.lock:
+            if host not in self.sessions:
+                retry = Retry(total=config['http_retries'],
+                              backoff_factor=config['http_backoff'],
+                              status_forcelist=[500, 502, 504],
+                              # 429 and 503 responses are left to the host limiter
+                              respect_retry_after_header=False,
+                              allowed_methods=['HEAD', 'GET', 'POST'],
+                              raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=config['http_pool_size'],
+                                      max_retries=retry)
+                session = Session()
+                session.headers['user-agent'] = config['user-agent']
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[host] = session
+                limits = config['http_host_limits'].get(host, {})
+                self.host_limits[host] = HostLimiter(
+                    limits.get('rate', config['http_rate']),
+                    limits.get('concurrency', config['http_host_concurrency']))
+            return self.sessions[host], self.host_limits[host]
+
+    def send(self, method: str, url: str, **kwargs):
+        session, host_limit = self.session(urlsplit(url).netloc)
+        timeout = kwargs.get('timeout')
+        for attempt in range(config['http_retries'] + 1):
+            # a (connect, read) timeout bounds the wait like a connection
+            host_limit.acquire(timeout[0] if isinstance(timeout, tuple) else timeout)
+            start = time.time()
+            try:
+                response = session.request(method, url, **kwargs)
+            except Exception:
+                host_limit.release(None, time.time() - start)
+                raise
+            host_limit.release(response.status_code, time.time() - start,
+                               response.headers.get('Retry-After'))
+            if response.status_code not in (429, 503):
+                break
+        return response
+
+    @staticmethod
+    def request_key(method: str, url: str, kwargs: dict):
+        ''' Key of a request: its method, URL with sorted query parameters,
+        body and headers.
+        '''
+        params = kwargs.get('params')
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        prepared = Request(method, url, params=params, data=kwargs.get('data'),
+                           json=kwargs.get('json')).prepare()
+        headers = tuple(sorted((kwargs.get('headers') or {}).items()))
+        return (prepared.method, prepared.url, prepared.body, headers)
+
+    def request(self, method: str, url: str, **kwargs):
+        kwargs.setdefault('timeout', config['http_timeout'])
+        if method.upper() not in ('GET', 'HEAD') or kwargs.get('stream'):
+            return self.send(method, url, **kwargs)
+        key = Client.request_key(method, url, kwargs)
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                future.set_result(self.send(method, url, **kwargs))
+            except Exception as ex:
+                future.set_exception(ex)
+            finally:
+                with self.lock:
+                    self.inflight.pop(key, None)
+        return future.result()
+
+    def get(self, url: str, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url: str, data=None, json=None, **kwargs):
+        return self.request('POST', url, data=data, json=json, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        ''' Close the connection pools of all hosts '''
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+            self.host_limits = {}
+
 
-requests = session
\ No newline at end of file
+requests = Client()
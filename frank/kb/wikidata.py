@@ -5,8 +5,10 @@ Description: Interface to Wikidata
 
 '''
 
-import requests
-import difflib
+import json
+from frank.kb.utils.requests import requests
+from frank.kb.utils.cache import TTLStore
+from frank.kb.utils import property_index
 import urllib.parse
 from pymongo import MongoClient
 from frank.alist import Alist
@@ -18,6 +20,12 @@ import frank.util.utils
 from datetime import datetime
 import frank.dataloader
 
+# (entity name, property id) -> entity id; '' for names with no entity
+entity_cache = TTLStore('wikidata_entities', config.config['entity_cache_ttl'],
+                        maxsize=config.config['entity_cache_size'])
+# property id -> labels of the classes in its domain constraints
+domain_cache = TTLStore('wikidata_property_domains', config.config['property_domain_ttl'])
+
 
 def search_properties(search_term):
     cache = {
@@ -37,15 +45,9 @@ def search_properties(search_term):
     if config.config['use_db']:
         return search_db_properties(search_term)
     else:
-        df = frank.dataloader.load_wikidata_props()
-        df['score'] = df['label'].apply(
-            lambda x: difflib.SequenceMatcher(None, search_term, x).ratio())
-        df_sorted = df.sort_values(by=['score'], ascending=False)
-        df_sorted = df_sorted[df_sorted['score'] > 0.8]
-        if len(df_sorted) > 0:
-            return [(df_sorted.iloc[0]['id'], df_sorted.iloc[0]['label'], df_sorted.iloc[0]['score'])]
-        else:
-            return []
+        index = property_index.load_index(
+            'wikidata_props', frank.dataloader.load_wikidata_props)
+        return index.search(search_term, threshold=0.8, limit=1)
 
 
 def search_db_properties(search_term): 
@@ -74,6 +76,23 @@ def find_entity(entity_name: str, property_id: str, is_head=True):
         return ''
     if entity_name.lower() == 'country':
         return 'Q6256'
+    key = json.dumps([entity_name, property_id])
+    entity_id = entity_cache.get(key)
+    if entity_id is None:
+        entity_id = resolve_entity(entity_name, property_id)
+        if entity_id is not None:
+            # names that resolve to no entity are remembered for a shorter time
+            entity_cache.put(key, entity_id,
+                             ttl=None if entity_id else config.config['entity_negative_ttl'])
+    # '' if there is no such entity, or None if the lookup failed
+    return entity_id
+
+
+def resolve_entity(entity_name: str, property_id: str):
+    """
+    Returns the id of the entity with the name whose classes include the 
+    domain of the property, '' if there is none, or None if the lookup failed.
+    """
     params = {
         'action': 'wbsearchentities',
         'search': entity_name,
@@ -88,42 +107,33 @@ def find_entity(entity_name: str, property_id: str, is_head=True):
     if property_id:
         ids = []
         # get domain of property
-        domain = []
-        query_domain = """SELECT DISTINCT ?oLabel WHERE {{
-                    wd:{property_id} p:P2302 ?p .            # statement about property constraints
-                    ?p pq:P2308 ?o .                         # get domain of property
-                    SERVICE wikibase:label {{  bd:serviceParam wikibase:language "en" .  }} }}
-                """.format(property_id=property_id)
-        params = {'format': 'json', 'query': query_domain}
-        response = requests.get(url='https://query.wikidata.org/sparql', params=params)  
+        domain = find_property_domain(property_id)
+        if domain is None:
+            return None
         try:
-            data_domain = response.json()
-            if len(data_domain['results']['bindings']) > 0:
-                domain = [d['oLabel']['value'] for d in data_domain['results']['bindings']]
-
-            # todo get domains from cache
-            if domain:            
-                for d in data['search']:
-                    # get classes of entity and
-                    # check if the instance/subclass paths of the entity include the domain of the property 
-                    query_entity_class = """SELECT DISTINCT ?oLabel WHERE {{
-                            wd:{entity_id} (wdt:P31/wdt:P279*) ?o .  # instance/subclass of entity
-                            SERVICE wikibase:label {{  bd:serviceParam wikibase:language "en" .  }} }}
-                        """.format(entity_id=d['id'])            
-                    params = {'format': 'json', 'query': query_entity_class}
-                    response = requests.get(url='https://query.wikidata.org/sparql', params=params)
-                    
-                    data_class = response.json()
-                    classes = []
-                    if len(data_class['results']['bindings']) > 0:                    
-                        classes = [d['oLabel']['value'] for d in data_class['results']['bindings']]
-
-                    if len(set(domain).intersection(set(classes))) > 0:
-                        ids.append(d['id'])
-                        break  # greedy                 
+            candidates = [d['id'] for d in data['search']]
+            if domain and candidates:
+                # check the instance/subclass paths of all the candidates 
+                # against the domain of the property in one query
+                query_entity_class = """SELECT DISTINCT ?item WHERE {{
+                        VALUES ?item {{ {items} }}
+                        VALUES ?domain {{ {domain} }}
+                        ?item (wdt:P31/wdt:P279*) ?o .  # instance/subclass of entity
+                        ?o rdfs:label ?domain . }}
+                    """.format(items=' '.join(f'wd:{c}' for c in candidates),
+                               domain=' '.join(f'{json.dumps(d)}@en' for d in domain))
+                params = {'format': 'json', 'query': query_entity_class}
+                response = requests.get(url='https://query.wikidata.org/sparql', params=params)
+
+                data_class = response.json()
+                matches = set(d['item']['value'].split('/')[-1]
+                              for d in data_class['results']['bindings'])
+                # greedy: the best ranked search result in the domain
+                ids = [c for c in candidates if c in matches][:1]
 
         except Exception as e:
             print("wikidata entity analysis error: " + str(e))
+            return None
     
     else:
         ids = [x['id'] for x in data['search']]
@@ -131,7 +141,35 @@ def find_entity(entity_name: str, property_id: str, is_head=True):
     return ids[0] if len(ids) > 0 else ''
 
 
+def find_property_domain(property_id: str):
+    """
+    Returns the labels of the classes in the domain constraints of a 
+    property, or None if the lookup failed.
+    """
+    domain = domain_cache.get(property_id)
+    if domain is not None:
+        return domain
+    query_domain = """SELECT DISTINCT ?oLabel WHERE {{
+                wd:{property_id} p:P2302 ?p .            # statement about property constraints
+                ?p pq:P2308 ?o .                         # get domain of property
+                SERVICE wikibase:label {{  bd:serviceParam wikibase:language "en" .  }} }}
+            """.format(property_id=property_id)
+    params = {'format': 'json', 'query': query_domain}
+    try:
+        response = requests.get(url='https://query.wikidata.org/sparql', params=params)
+        data_domain = response.json()
+        domain = [d['oLabel']['value'] for d in data_domain['results']['bindings']]
+    except Exception as e:
+        print("wikidata property domain error: " + str(e))
+        return None
+    domain_cache.put(property_id, domain)
+    return domain
+
+
 def find_property_values(alist: Alist, search_element: str):
+    """
+    Returns the fact alists found for the alist, or None if the lookup failed.
+    """
     if not alist.get(tt.PROPERTY):
         return {}
 
@@ -146,7 +184,7 @@ def find_property_values(alist: Alist, search_element: str):
 def find_property_subject(alist: Alist):
     entity_id = find_entity(alist.instantiation_value(tt.OBJECT), alist.get(tt.PROPERTY))
     if not entity_id:
-        return []
+        return None if entity_id is None else []
 
     # compose wikidata query
     query = ""
@@ -173,6 +211,8 @@ def find_property_subject(alist: Alist):
     response = requests.get(
         url='https://query.wikidata.org/sparql', params=params)
     alist_arr = []
+    if not response.ok:
+        return None
     try:
         data = response.json()
         for d in data['results']['bindings']:
@@ -185,6 +225,7 @@ def find_property_subject(alist: Alist):
             alist_arr.append(data_alist)
     except Exception as e:
         print("wikidata query response error: " + str(e))
+        return None
 
     return alist_arr
 
@@ -198,7 +239,7 @@ def find_property_object(alist: Alist):
     else:
         entity_id = find_entity(alist.instantiation_value(tt.SUBJECT), alist.get(tt.PROPERTY))
         if not entity_id:
-            return []
+            return None if entity_id is None else []
 
     # compose wikidata query
     query = """
@@ -219,6 +260,8 @@ def find_property_object(alist: Alist):
     response = requests.get(
         url='https://query.wikidata.org/sparql', params=params)
     alist_arr = []
+    if not response.ok:
+        return None
     try:
         data = response.json()
         ctx = {}
@@ -278,10 +321,71 @@ def find_property_object(alist: Alist):
 
     except Exception as ex:
         print("wikidata query response error: " + str(ex))
+        return None
 
     return alist_arr
 
 
+def find_property_object_batch(alist: Alist, times: list):
+    """
+    Find the values of the property of the subject of alist at each of the 
+    given years with a single query. 
+    Returns a dict of fact alists keyed by year, or None if the lookup 
+    failed. Only statements qualified with a point in time or start time 
+    in one of the years are returned.
+    """
+    years = sorted(set(str(t).replace(".0", "") for t in times
+                       if frank.util.utils.is_numeric(t)))
+    results = {y: [] for y in years}
+    if not years:
+        return results
+    entity_id = None
+    wikidata_base_uri = 'http://www.wikidata.org/entity/'
+    if wikidata_base_uri in alist.instantiation_value(tt.SUBJECT):
+        entity_id = alist.instantiation_value(
+            tt.SUBJECT)[len(wikidata_base_uri):]
+    else:
+        entity_id = find_entity(alist.instantiation_value(tt.SUBJECT), alist.get(tt.PROPERTY))
+        if not entity_id:
+            return None if entity_id is None else results
+
+    query = """
+        SELECT DISTINCT ?oLabel ?year WHERE {{
+            VALUES ?year {{ {years} }}
+            wd:{entity_id} p:{property_id} ?ob .
+            ?ob ps:{property_id} ?o .
+            {{ ?ob pq:P585 ?date . }} UNION {{ ?ob pq:P580 ?date . }}
+            FILTER (YEAR(?date) = ?year)
+            SERVICE wikibase:label {{  bd:serviceParam wikibase:language "en" .  }}  }}
+        """.format(
+        entity_id=entity_id,
+        property_id=alist.get(tt.PROPERTY),
+        years=' '.join(years))
+
+    params = {'format': 'json', 'query': query}
+    response = requests.get(
+        url='https://query.wikidata.org/sparql', params=params)
+    if not response.ok:
+        return None
+    try:
+        data = response.json()
+        for d in data['results']['bindings']:
+            year = d['year']['value']
+            if year not in results:
+                continue
+            data_alist = alist.copy()
+            data_alist.set(tt.OBJECT, d['oLabel']['value'])
+            data_alist.set(tt.TIME, year)
+            data_alist.data_sources = list(
+                set(data_alist.data_sources + ['wikidata']))
+            results[year].append(data_alist)
+    except Exception as ex:
+        print("wikidata query response error: " + str(ex))
+        return None
+
+    return results
+
+
 def find_propert_time(alist: Alist):
     pass
 
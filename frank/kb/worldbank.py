@@ -5,13 +5,15 @@ Description: Interface to the World Bank dataset.
 
 '''
 
-import requests
+from frank.kb.utils.requests import requests
 import urllib.parse
 from frank.alist import Alist
 from frank.alist import Attributes as tt
 from frank.kb import rdf
 from frank.kb import mongo
+from frank.kb import worldbank_store
 from frank import config
+from frank.kb.utils.cache import TTLStore
 import frank.dataloader
 
 indicators = {
@@ -34,6 +36,9 @@ common_synonyms = {
     "USA": "United States of America"
 }
 
+# full indicator series keyed by country and indicator
+series_cache = TTLStore('worldbank_series', config.config['worldbank_series_ttl'])
+
 
 def search_properties(search_term):
     results = []
@@ -44,6 +49,9 @@ def search_properties(search_term):
 
 
 def find_property_values(alist: Alist, search_element: str):
+    """
+    Returns the fact alists found for the alist, or None if the lookup failed.
+    """
     if not alist.get(tt.PROPERTY):
         return {}
 
@@ -66,28 +74,56 @@ def find_property_object(alist: Alist):
     if not country_id:
         return results
 
+    year = str(alist.get(tt.TIME)).replace(".0", "") if alist.get(tt.TIME) else ''
+    # values in the local store are used before the API
+    series = worldbank_store.find_values(country_id, alist.get(tt.PROPERTY), year)
+    if not series:
+        series = find_indicator_series(country_id, alist.get(tt.PROPERTY))
+        if series is None:
+            return None
+    for date, value in series:
+        if value and (not year or date == year):
+            data_alist = alist.copy()
+            data_alist.set(tt.OBJECT, value)
+            data_alist.data_sources = list(
+                set(data_alist.data_sources + ['worldbank']))
+            results.append(data_alist)
+
+    return results
+
+
+def find_indicator_series(country_id: str, indicator: str):
+    """
+    Returns the full series of an indicator for a country as a list of 
+    [date, value] pairs, latest date first. 
+    The series is fetched once and then answered from the series cache.
+    """
+    return series_cache.get_or_load(f'{country_id}/{indicator}',
+                                    lambda: fetch_indicator_series(country_id, indicator))
+
+
+def fetch_indicator_series(country_id: str, indicator: str):
+    series = []
+    page, pages = 1, 1
     try:
-        params = {'date': str(alist.get(tt.TIME)).replace(
-            ".0", ""), 'format': 'json', 'per_page': 1000}
-        response = requests.get(
-            url=f'http://api.worldbank.org/v2/countries/{country_id}/indicators/{alist.get(tt.PROPERTY)}',
-            params=params)
-        try:
+        while page <= pages:
+            params = {'format': 'json', 'per_page': 1000, 'page': page}
+            response = requests.get(
+                url=f'http://api.worldbank.org/v2/countries/{country_id}/indicators/{indicator}',
+                params=params)
             data = response.json()
             if len(data) > 1 and data[1]:
-                for d in data[1]:
-                    if d['value']:
-                        data_alist = alist.copy()
-                        data_alist.set(tt.OBJECT, d['value'])
-                        data_alist.data_sources = list(
-                            set(data_alist.data_sources + ['worldbank']))
-                        results.append(data_alist)
-        except Exception as ex:
-            print("worldbank query response error: " + str(ex))
+                pages = int(data[0].get('pages', 1))
+                series.extend([[d['date'], d['value']] for d in data[1]])
+            elif 'message' in data[0]:
+                # unknown country or indicator
+                break
+            page += 1
     except Exception as ex:
         print("worldbank query error: " + str(ex))
+        return None
 
-    return results
+    return series
 
 
 def getCountryPropertyDb_db(countryName, countryProperty):
@@ -0,0 +1,112 @@
+'''
+File: worldbank_store.py
+Description: Local store of World Bank indicator values built from bulk CSV exports.
+
+Usage: python -m frank.kb.worldbank_store ingest <csv file> [<csv file> ...]
+
+The CSV files are the World Bank bulk downloads (e.g. API_SP.POP.TOTL_DS2_en_csv_v2.csv
+or WDIData.csv), with a row per country and indicator and a column per year.
+'''
+
+import os
+import csv
+import sqlite3
+import argparse
+import threading
+from frank import config
+
+local = threading.local()
+
+
+def store_path():
+    return config.config['worldbank_store'] or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'data', 'worldbank.sqlite')
+
+
+def connection():
+    ''' Read-only connection of the current thread, or None if there is no store '''
+    path = store_path()
+    conn = getattr(local, 'conn', None)
+    if conn is not None and local.path == path:
+        return conn
+    if not os.path.isfile(path):
+        return None
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+    local.conn, local.path = conn, path
+    return conn
+
+
+def find_values(country_id: str, indicator: str, year=''):
+    ''' Returns the [year, value] pairs of an indicator for a country,
+    latest year first; only the given year if one is given.
+    '''
+    conn = connection()
+    if conn is None:
+        return []
+    try:
+        if year:
+            rows = conn.execute(
+                'SELECT year, value FROM indicator_values WHERE country=? AND indicator=? AND year=?',
+                (country_id, indicator, int(year))).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT year, value FROM indicator_values WHERE country=? AND indicator=? ORDER BY year DESC',
+                (country_id, indicator)).fetchall()
+    except (sqlite3.Error, ValueError) as ex:
+        print("worldbank store error: " + str(ex))
+        return []
+    return [[str(y), v] for y, v in rows]
+
+
+def read_rows(csv_path: str):
+    ''' Yield (country, indicator, year, value) tuples from a bulk CSV export '''
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = None
+        for row in reader:
+            if header is None:
+                # skip the metadata lines before the header
+                if row and row[0] == 'Country Name':
+                    header = row
+                continue
+            for i in range(4, min(len(row), len(header))):
+                if header[i].isdigit() and row[i].strip():
+                    yield (row[1], row[3], int(header[i]), float(row[i]))
+
+
+def ingest(csv_paths: list, path=None):
+    ''' Add the values in the CSV files to the store, creating it if needed '''
+    path = path or store_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    count = 0
+    try:
+        conn.execute('''CREATE TABLE IF NOT EXISTS indicator_values (
+                            country TEXT, indicator TEXT, year INTEGER, value REAL,
+                            PRIMARY KEY (country, indicator, year)) WITHOUT ROWID''')
+        for csv_path in csv_paths:
+            rows = read_rows(csv_path)
+            while True:
+                batch = [r for _, r in zip(range(10000), rows)]
+                if not batch:
+                    break
+                conn.executemany(
+                    'INSERT OR REPLACE INTO indicator_values VALUES (?, ?, ?, ?)', batch)
+                count += len(batch)
+            conn.commit()
+    finally:
+        conn.close()
+    return count
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        prog="python -m frank.kb.worldbank_store",
+        description="Build the local store of World Bank indicator values")
+    argparser.add_argument("command", choices=["ingest"],
+        help="ingest: add the values in World Bank bulk CSV exports to the store")
+    argparser.add_argument("files", nargs="+", help="bulk CSV export files")
+    args = argparser.parse_args()
+    n = ingest(args.files)
+    print(f"{n} values -> {store_path()}")
@@ -9,6 +9,7 @@ import timeit
 import uuid
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from frank.infer import Infer
 
 from frank.alist import Alist
@@ -19,7 +20,9 @@ from frank import config
 from frank.util import utils
 from frank.graph import InferenceGraph
 from frank.processLog import pcolors as pcol
+from frank import processLog
 import frank.context
+import frank.cache.answers
 
 
 class Launcher():
@@ -29,85 +32,199 @@ class Launcher():
         self.timeout = 60  # self.timeout in seconds
         self.start_time = time.time()
         self.inference_graphs = {}
+        self.worker_pool = None
+        self.work_done = threading.Condition()
+        self.finished = []
+        self.answer_key = None
+        self.max_nodes = 0
+        self.truncated = False
 
-    def start(self, alist: Alist, session_id, inference_graphs):
-        ''' Create new inference graph to infere answer'''
+    def start(self, alist: Alist, session_id, inference_graphs,
+              deadline=None, max_kb_calls=None, max_nodes=None):
+        ''' Create new inference graph to infere answer.
+
+        The deadline (in seconds) and the caps on KB calls and graph nodes 
+        default to the `query_deadline`, `max_kb_calls` and `max_nodes` 
+        settings. When a budget runs out, the best root answer found so far 
+        is returned with its error bar.
+        '''
         G = InferenceGraph()
         self.frank_infer = Infer(G)
         self.frank_infer.session_id = session_id
         self.inference_graphs = inference_graphs
         self.start_time = time.time()
         self.frank_infer.last_heartbeat = time.time()
+        deadline = config.config['query_deadline'] if deadline is None else deadline
+        if deadline and float(deadline) > 0:
+            self.frank_infer.deadline = self.start_time + float(deadline)
+        self.frank_infer.max_kb_calls = int(
+            config.config['max_kb_calls'] if max_kb_calls is None else max_kb_calls)
+        self.max_nodes = int(
+            config.config['max_nodes'] if max_nodes is None else max_nodes)
+        self.truncated = False
         alist = frank.context.inject_query_context(alist)
+        self.answer_key = frank.cache.answers.key(alist)
+        cached = frank.cache.answers.get(self.answer_key)
+        if cached is not None:
+            # answered recently by another session
+            cached['elapsed_time'] = f"{round(time.time() - self.start_time)}s"
+            G.add_alist(Alist(**cached['alist']))
+            self.inference_graphs[session_id] = {
+                'graph': G,
+                'intermediate_answer': cached,
+                'answer': cached,
+            }
+            print(f"\n{pcol.CYAN}Answer alist (cached){pcol.RESETALL} \n" +
+                  json.dumps(cached, indent=2))
+            return
         self.frank_infer.enqueue_root(alist)
+        self.worker_pool = ThreadPoolExecutor(
+            max_workers=max(1, int(config.config['thread_pool'])))
         self.schedule(-1)
 
-    def api_start(self, alist_obj, session_id, inference_graphs):
+    def api_start(self, alist_obj, session_id, inference_graphs,
+                  deadline=None, max_kb_calls=None, max_nodes=None):
 
         a = Alist(**alist_obj)
         t = threading.Thread(target=self.start, args=(
-            a, session_id, inference_graphs))
+            a, session_id, inference_graphs, deadline, max_kb_calls, max_nodes))
         t.start()
         return session_id
 
     def schedule(self, last_root_prop_depth):
         ''' Loop through the leaves of the inference graph and 
         schedule nodes to resolve.
-        '''
-        if time.time() - self.frank_infer.last_heartbeat > self.timeout:
-            # stop and print any answer found
-            self.cache_and_print_answer(True)
 
+        Unexplored leaves are handed to the worker pool. When there is 
+        nothing left to hand out, the loop waits on the `work_done` condition 
+        until a worker has finished updating the graph or the heartbeat 
+        times out.
+
+        Reducible leaves are always handled before new leaves are expanded 
+        so that the root answer stays current. Expansion stops once the KB 
+        call or node budget is used up, and the loop ends with the best 
+        answer found so far when the deadline passes or the heartbeat times 
+        out. Workers still running then are abandoned and their results 
+        ignored.
+        '''
+        G = self.frank_infer.G
         max_prop_depth_diff = 1
-        stop_flag = False
+        pool_size = max(1, int(config.config['thread_pool']))
+        in_flight = {}
+        stop_expanding = False
+        attempted = set()
         while True:
-            if self.frank_infer.session_id in self.inference_graphs:
-                self.inference_graphs[self.frank_infer.session_id]['graph'] = self.frank_infer.G
-            else:
-                self.inference_graphs[self.frank_infer.session_id] = {
-                    'graph': self.frank_infer.G,
-                    'intermediate_answer': None,
-                    'answer': None,
-                }
-            flag = False
-            # first check if there are any leaf nodes that can be reduced
-            reducible = self.frank_infer.G.frontier(
-                state=states.REDUCIBLE, update_state=False)
+            self.publish_graph()
+
+            # handle the alists resolved by workers since the last pass
+            with self.work_done:
+                finished, self.finished = self.finished, []
+            for future in finished:
+                node = in_flight.pop(future)
+                if self.worker_result(node, future):
+                    last_root_prop_depth = node.depth
+                    self.cache_and_print_answer(False)
+
+            if time.time() - self.frank_infer.last_heartbeat > self.timeout:
+                # stop and print any answer found
+                self.truncated = True
+                break
+            if self.frank_infer.past_deadline():
+                self.truncated = True
+                break
+
+            # first check if there are any leaf nodes that can be reduced.
+            # Each is tried once until a worker changes the graph again.
+            if finished:
+                attempted = set()
+            reducible = [x for x in G.frontier(size=len(attempted) + 1,
+                                               state=states.REDUCIBLE, update_state=False)
+                         if x.id not in attempted]
             if reducible:
+                attempted.add(reducible[0].id)
                 propagatedToRoot = self.frank_infer.run_frank(reducible[0])
                 if propagatedToRoot:
+                    attempted = set()
                     self.cache_and_print_answer(False)
-                    flag = True
-
-            if not flag:
-                # check if there are any unexplored leaf nodes
-                unexplored = self.frank_infer.G.frontier(
-                    state=states.UNEXPLORED)
-                if unexplored and last_root_prop_depth > 0 and (unexplored[0].depth > last_root_prop_depth + max_prop_depth_diff):
-                    stop_flag = True
-                    break
-                if unexplored:
-                    propagatedToRoot = self.frank_infer.run_frank(
-                        unexplored[0])
-                    if propagatedToRoot:
-                        last_root_prop_depth = unexplored[0].depth
-                        self.cache_and_print_answer(False)
-                        flag = True
-            if not flag:
+                continue
+
+            # check if there are any unexplored leaf nodes
+            unexplored = []
+            if not stop_expanding and self.budget_exhausted():
+                stop_expanding = True
+                self.truncated = True
+            if len(in_flight) < pool_size and not stop_expanding:
+                # peek first, so that leaves too deep to expand stay UNEXPLORED
+                next_leaf = G.frontier(size=1, state=states.UNEXPLORED, update_state=False)
+                if next_leaf and last_root_prop_depth > 0 and (next_leaf[0].depth > last_root_prop_depth + max_prop_depth_diff):
+                    # stop expanding but let the alists already being explored finish
+                    stop_expanding = True
+                elif next_leaf:
+                    unexplored = G.frontier(
+                        size=pool_size - len(in_flight), state=states.UNEXPLORED)
+            for node in unexplored:
+                future = self.worker_pool.submit(
+                    self.frank_infer.run_frank, node)
+                in_flight[future] = node
+                future.add_done_callback(self.worker_done)
+
+            if not in_flight:
+                # nothing being explored and nothing left to explore
                 break
 
-        if stop_flag:
-            self.cache_and_print_answer(True)
-        else:
-            # if no answer has been propagated to root and
-            if time.time() - self.frank_infer.last_heartbeat <= self.timeout:
-                time.sleep(3)
+            with self.work_done:
+                remaining = self.timeout - \
+                    (time.time() - self.frank_infer.last_heartbeat)
+                if self.frank_infer.deadline is not None:
+                    remaining = min(
+                        remaining, self.frank_infer.deadline - time.time())
+                self.work_done.wait_for(
+                    lambda: self.finished, timeout=max(0, remaining))
 
-            if self.frank_infer.G.frontier(update_state=False):
-                self.schedule(last_root_prop_depth)
-            else:
-                # stop and print any answer found
-                self.cache_and_print_answer(True)
+        self.stop_workers(in_flight)
+        self.cache_and_print_answer(True)
+
+    def stop_workers(self, in_flight):
+        ''' Stop the workers without waiting for the alists still being explored.
+
+        Workers that finish later no longer propagate answers to the root.
+        '''
+        with self.frank_infer.propagation_lock:
+            self.frank_infer.stopped = True
+        # same as shutdown(cancel_futures=True), which needs Python 3.9
+        for future in in_flight:
+            future.cancel()
+        self.worker_pool.shutdown(wait=False)
+
+    def budget_exhausted(self):
+        ''' True if no more alists should be expanded for the query '''
+        return self.frank_infer.kb_budget_exhausted() or \
+            (self.max_nodes > 0 and self.frank_infer.G.number_of_nodes() >= self.max_nodes)
+
+    def worker_done(self, future):
+        ''' Wake the scheduler when a worker finishes an alist '''
+        with self.work_done:
+            self.finished.append(future)
+            self.work_done.notify_all()
+
+    def worker_result(self, alist, future):
+        try:
+            return future.result()
+        except Exception as ex:
+            self.frank_infer.write_trace(
+                f"{pcol.RED}Error expanding {alist.id}{pcol.RESETALL}: {str(ex)}",
+                processLog.LogLevel.ERROR)
+            return []
+
+    def publish_graph(self):
+        if self.frank_infer.session_id in self.inference_graphs:
+            self.inference_graphs[self.frank_infer.session_id]['graph'] = self.frank_infer.G
+        else:
+            self.inference_graphs[self.frank_infer.session_id] = {
+                'graph': self.frank_infer.G,
+                'intermediate_answer': None,
+                'answer': None,
+            }
 
     def cache_and_print_answer(self, isFinal=False):
         elapsed_time = time.time() - self.start_time
@@ -148,6 +265,7 @@ class Launcher():
                        "error_bar": f"{errorbar_sigdig}",
                        "sources": f"{','.join(list(latest_root.data_sources))}",
                        "elapsed_time": f"{round(elapsed_time)}s",
+                       "truncated": self.truncated,
                        "alist": self.frank_infer.propagated_alists[-1].attributes
                        }
 
@@ -158,6 +276,9 @@ class Launcher():
             }
 
             if isFinal:
+                # an answer cut short by a budget may improve with a larger one
+                if not self.truncated:
+                    frank.cache.answers.put(self.answer_key, ans_obj)
                 print(f"\n{pcol.CYAN}Answer alist{pcol.RESETALL} \n" +
                       json.dumps(ans_obj, indent=2))
 
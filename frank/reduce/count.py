@@ -14,6 +14,7 @@ from frank.alist import States as states
 from frank.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
+from frank.uncertainty.aggregateUncertainty import accumulate_uncertainty, running_uncertainty
 from frank.graph import InferenceGraph
 
 
@@ -27,3 +28,17 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
         children, False, alist.get(tt.OP), len(children)
     ))
     return alist
+
+
+def accumulate(state: dict, alist: Alist, child: Alist):
+    ''' Fold a reducible child into the running count '''
+    state.setdefault('children', set()).add(child.id)
+    accumulate_uncertainty(state, child)
+
+
+def finalize(state: dict, alist: Alist, G: InferenceGraph):
+    alist.instantiate_variable(alist.get(tt.OPVAR), len(state['children']))
+    alist.instantiate_variable(tt.COV, running_uncertainty(
+        state, False, alist.get(tt.OP), len(state['children'])
+    ))
+    return alist
@@ -14,6 +14,7 @@ from frank.alist import States as states
 from frank.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
+from frank.uncertainty.aggregateUncertainty import accumulate_uncertainty, running_uncertainty
 from frank.reduce import propagate
 from frank.graph import InferenceGraph
 
@@ -39,3 +40,35 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
         children, allNumeric, alist.get(tt.OP), len(children)
     ))
     return alist
+
+
+def accumulate(state: dict, alist: Alist, child: Alist):
+    ''' Fold a reducible child into the running mean '''
+    for k, v in child.instantiated_attributes().items():
+        if k in alist.attributes:
+            alist.instantiate_variable(k, v)
+
+    values = state.setdefault('values', {})
+    old_value = values.get(child.id)
+    if old_value is False:
+        state['non_numeric'] -= 1
+    elif old_value is not None:
+        state['total'] -= old_value
+    opVarValue = child.get(child.get(tt.OPVAR))
+    if utils.is_numeric(opVarValue):
+        values[child.id] = float(opVarValue)
+        state['total'] = state.get('total', 0.0) + values[child.id]
+    else:
+        values[child.id] = False
+        state['non_numeric'] = state.get('non_numeric', 0) + 1
+    accumulate_uncertainty(state, child)
+
+
+def finalize(state: dict, alist: Alist, G: InferenceGraph):
+    alist.instantiate_variable(
+        alist.get(tt.OPVAR), state.get('total', 0.0) / len(state['values']))
+
+    alist.instantiate_variable(tt.COV, running_uncertainty(
+        state, not state.get('non_numeric'), alist.get(tt.OP), len(state['values'])
+    ))
+    return alist
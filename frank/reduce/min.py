@@ -14,6 +14,7 @@ from frank.alist import States as states
 from frank.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
+from frank.uncertainty.aggregateUncertainty import accumulate_uncertainty, running_uncertainty
 from frank.reduce import propagate
 from frank.graph import InferenceGraph
 
@@ -31,3 +32,40 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
         children, True, alist.get(tt.OP), len(children)
     ))
     return alist
+
+
+def accumulate(state: dict, alist: Alist, child: Alist):
+    ''' Fold a reducible child into the running minimum '''
+    values = state.setdefault('values', {})
+    value = utils.get_number(child.instantiation_value(
+        alist.get(tt.OPVAR)), 999999999999999)
+    projVars = child.projection_variables() or {}
+    state.setdefault('projections', {})[child.id] = {
+        pvkey: child.instantiation_value(pvkey) for pvkey in projVars}
+    best = state.get('best')
+    if state.get('stale'):
+        pass
+    elif best is None or value < values[best]:
+        state['best'] = child.id
+    elif best == child.id and value != values[best]:
+        # the current minimum changed; find it again when finalizing
+        state['stale'] = True
+    values[child.id] = value
+    accumulate_uncertainty(state, child)
+
+
+def finalize(state: dict, alist: Alist, G: InferenceGraph):
+    values = state['values']
+    if state.get('stale'):
+        state['best'] = min(values, key=values.get)
+        state['stale'] = False
+    alist.instantiate_variable(alist.get(tt.OPVAR), values[state['best']])
+
+    # copy projection vars of the min child to the alist
+    for pvkey, pv in state['projections'][state['best']].items():
+        alist.instantiate_variable(pvkey, pv, insert_missing=True)
+
+    alist.instantiate_variable(tt.COV, running_uncertainty(
+        state, True, alist.get(tt.OP), len(values)
+    ))
+    return alist
@@ -15,6 +15,7 @@ from frank.alist import States as states
 from frank.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
+from frank.uncertainty.aggregateUncertainty import accumulate_uncertainty, running_uncertainty
 from frank.reduce import propagate
 from frank.graph import InferenceGraph
 
@@ -53,3 +54,61 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
             children), alist.get(tt.OP), len(children)
     ))
     return alist
+
+
+def accumulate(state: dict, alist: Alist, child: Alist):
+    ''' Fold a reducible child into the running least squares sums.
+        Sums are kept relative to the first data point to limit rounding 
+        errors with large x (years) and y values.
+    '''
+    points = state.setdefault('points', {})
+    state.setdefault('children', set()).add(child.id)
+    old_point = points.pop(child.id, None)
+    if old_point is not None:
+        _add_point(state, old_point, -1)
+
+    opVarValue = child.instantiation_value(child.get(tt.OPVAR))
+    if utils.is_numeric(opVarValue) and utils.is_numeric(child.get(tt.TIME)):
+        point = (utils.get_number(child.get(tt.TIME), None),
+                 utils.get_number(opVarValue, None))
+        if 'origin' not in state:
+            state['origin'] = point
+        points[child.id] = point
+        _add_point(state, point, 1)
+    accumulate_uncertainty(state, child)
+
+
+def _add_point(state, point, sign):
+    x = point[0] - state['origin'][0]
+    y = point[1] - state['origin'][1]
+    for k, v in [('n', 1), ('sx', x), ('sy', y), ('sxx', x * x), ('sxy', x * y)]:
+        state[k] = state.get(k, 0.0) + sign * v
+
+
+def finalize(state: dict, alist: Alist, G: InferenceGraph):
+    x_predict = utils.get_number(alist.get(tt.TIME), None)
+    n = state.get('n', 0)
+    if not n or x_predict is None:
+        return None
+    x0, y0 = state['origin']
+    denominator = n * state['sxx'] - state['sx'] ** 2
+    slope = (n * state['sxy'] - state['sx'] * state['sy']) / \
+        denominator if denominator else 0.0
+    intercept = y0 + (state['sy'] - slope * state['sx']) / n - slope * x0
+    y_predict = intercept + slope * x_predict
+
+    data_pts = [[x, y] for x, y in state['points'].values()]
+    prediction = [x_predict, y_predict]
+    coeffs = [intercept, slope]
+    fnAndData = \
+        """{{"function":{coeffs}, "data":{data_pts}, "prediction":{prediction}}}""".format(
+            coeffs=coeffs, data_pts=data_pts, prediction=prediction)
+
+    alist.instantiate_variable(alist.get(tt.OPVAR), y_predict)
+    alist.set(tt.FNPLOT, fnAndData)
+
+    alist.instantiate_variable(tt.COV, running_uncertainty(
+        state, len(state['points']) == len(state['children']), alist.get(tt.OP), 
+        len(state['children'])
+    ))
+    return alist
@@ -14,6 +14,7 @@ from frank.alist import States as states
 from frank.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
+from frank.uncertainty.aggregateUncertainty import accumulate_uncertainty, running_uncertainty
 from frank.reduce import propagate
 from frank.graph import InferenceGraph
 
@@ -28,3 +29,20 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
         children, True, alist.get(tt.OP), len(children)
     ))
     return alist
+
+
+def accumulate(state: dict, alist: Alist, child: Alist):
+    ''' Fold a reducible child into the running sum '''
+    values = state.setdefault('values', {})
+    value = utils.get_number(child.instantiation_value(alist.get(tt.OPVAR)), 0)
+    state['total'] = state.get('total', 0.0) - values.get(child.id, 0.0) + value
+    values[child.id] = value
+    accumulate_uncertainty(state, child)
+
+
+def finalize(state: dict, alist: Alist, G: InferenceGraph):
+    alist.instantiate_variable(alist.get(tt.OPVAR), state['total'])
+    alist.instantiate_variable(tt.COV, running_uncertainty(
+        state, True, alist.get(tt.OP), len(state['values'])
+    ))
+    return alist
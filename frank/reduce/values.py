@@ -14,6 +14,7 @@ from frank.alist import States as states
 from frank.alist import NodeTypes as nt
 from frank.util import utils
 from frank.uncertainty.aggregateUncertainty import estimate_uncertainty
+from frank.uncertainty.aggregateUncertainty import accumulate_uncertainty, running_uncertainty
 from frank.reduce import propagate
 from frank.graph import InferenceGraph
 
@@ -28,3 +29,20 @@ def reduce(alist: Alist, children: List[Alist], G: InferenceGraph):
         children, False, alist.get(tt.OP), len(children)
     ))
     return alist
+
+
+def accumulate(state: dict, alist: Alist, child: Alist):
+    ''' Fold a reducible child into the list of values '''
+    state.setdefault('values', {})[child.id] = str(
+        child.instantiation_value(alist.get(tt.OPVAR)))
+    accumulate_uncertainty(state, child)
+
+
+def finalize(state: dict, alist: Alist, G: InferenceGraph):
+    data_str = ','.join(state['values'].values())
+    alist.instantiate_variable(alist.get(tt.OPVAR), data_str)
+
+    alist.instantiate_variable(tt.COV, running_uncertainty(
+        state, False, alist.get(tt.OP), len(state['values'])
+    ))
+    return alist
@@ -13,37 +13,81 @@ from frank.util import utils
 def estimate_uncertainty(nodes: list, all_numeric: bool, operation: str, child_count: float) -> float:
     combined_confidence = 0.0
     try:
-        variance_values = []
         sum_variance = 0.0
         sum_mean = 0.0
         n = len(nodes)
-        # todo: for now assume the real-valued objects are being estimated
         for r in nodes:
-            node_variance = 0.0
-            objValue = r.instantiation_value(tt.OBJECT)
-            if utils.is_numeric(objValue):
-                numeric_value = utils.get_number(objValue, 0)
-                node_variance = math.pow(r.get(tt.COV) * numeric_value, 2)
-                sum_mean += numeric_value
-            else:
-                # todo: work on this later; may not work as expected for non-real-valued objects
-                node_variance = math.pow(r.get(tt.COV), 2)
-                sum_mean += 1.0
-            variance_values.append(node_variance)
+            node_variance, mean_term = uncertainty_terms(r)
             sum_variance += node_variance
+            sum_mean += mean_term
+        combined_confidence = combine_uncertainty(
+            sum_variance, sum_mean, n, operation, child_count)
 
-        missRatio = 1 - (len(nodes)/child_count)
-        if operation.lower() in ["value", "mean", "avg", "regress", "product"]:
-            combined_confidence = math.sqrt(sum_variance/n)/(sum_mean/n)
-        else:
-            combined_confidence = math.sqrt(sum_variance)/(sum_mean/n)
+    except Exception as e:
+        print("Uncertainty aggregate error: " + str(e))
+
+    return combined_confidence
+
+
+def uncertainty_terms(node: Alist):
+    """ Variance of a node and its contribution to the mean used to 
+        normalise the combined uncertainty. """
+    # todo: for now assume the real-valued objects are being estimated
+    objValue = node.instantiation_value(tt.OBJECT)
+    if utils.is_numeric(objValue):
+        numeric_value = utils.get_number(objValue, 0)
+        node_variance = math.pow(node.get(tt.COV) * numeric_value, 2)
+        mean_term = numeric_value
+    else:
+        # todo: work on this later; may not work as expected for non-real-valued objects
+        node_variance = math.pow(node.get(tt.COV), 2)
+        mean_term = 1.0
+    return (node_variance, mean_term)
+
+
+def combine_uncertainty(sum_variance: float, sum_mean: float, n: int, operation: str, child_count: float) -> float:
+    missRatio = 1 - (n/child_count)
+    if operation.lower() in ["value", "mean", "avg", "regress", "product"]:
+        combined_confidence = math.sqrt(sum_variance/n)/(sum_mean/n)
+    else:
+        combined_confidence = math.sqrt(sum_variance)/(sum_mean/n)
+
+    if not utils.is_numeric(combined_confidence):
+        combined_confidence = 0.0
+    combined_confidence = combined_confidence + \
+        (combined_confidence * missRatio)
+    return combined_confidence
 
-        if not utils.is_numeric(combined_confidence):
-            combined_confidence = 0.0
-        combined_confidence = combined_confidence + \
-            (combined_confidence * missRatio)
 
+def accumulate_uncertainty(state: dict, node: Alist):
+    """ Fold the uncertainty of a node into the running totals kept in 
+        `state`, replacing any earlier contribution of the same node. """
+    terms = state.setdefault('uncertainty_terms', {})
+    failed = state.setdefault('uncertainty_failed', set())
+    old_terms = terms.pop(node.id, None)
+    if old_terms is not None:
+        state['sum_variance'] -= old_terms[0]
+        state['sum_mean'] -= old_terms[1]
+    failed.discard(node.id)
+    try:
+        new_terms = uncertainty_terms(node)
     except Exception as e:
         print("Uncertainty aggregate error: " + str(e))
+        failed.add(node.id)
+        return
+    terms[node.id] = new_terms
+    state['sum_variance'] = state.get('sum_variance', 0.0) + new_terms[0]
+    state['sum_mean'] = state.get('sum_mean', 0.0) + new_terms[1]
 
-    return combined_confidence
+
+def running_uncertainty(state: dict, all_numeric: bool, operation: str, child_count: float) -> float:
+    """ Combined uncertainty of the nodes folded into `state` with 
+        `accumulate_uncertainty`. Same result as `estimate_uncertainty`. """
+    if state.get('uncertainty_failed'):
+        return 0.0
+    try:
+        return combine_uncertainty(state.get('sum_variance', 0.0), state.get('sum_mean', 0.0),
+                                   len(state.get('uncertainty_terms', {})), operation, child_count)
+    except Exception as e:
+        print("Uncertainty aggregate error: " + str(e))
+        return 0.0
@@ -0,0 +1,144 @@
+'''
+File: priorStore.py
+Description: In-memory tables of priors with write-behind persistence.
+
+
+'''
+
+import atexit
+import threading
+import pandas as pd
+from pymongo import UpdateOne
+from frank.config import config
+from frank.kb import mongo
+import frank.dataloader
+import frank.cache.answers
+
+
+class PriorStore():
+    ''' Table of prior records keyed by some of their fields.
+
+    Records are read from the dataset (or Mongo collection when `use_db`
+    is set) once and then served from memory. Updated records are marked
+    dirty and written back together by `flush`, which runs
+    `prior_flush_interval` seconds after the first pending update and at
+    shutdown. Datasets are replaced atomically; Mongo collections are
+    updated with bulk upserts.
+    '''
+
+    def __init__(self, name: str, collection: str, key_fields: list):
+        self.name = name
+        self.collection = collection
+        self.key_fields = key_fields
+        self.records = None
+        self.dirty = set()
+        self.lock = threading.RLock()
+        self.timer = None
+
+    def _load(self):
+        if self.records is not None:
+            return
+        records = {}
+        if not config['use_db']:
+            # with `use_db`, records are fetched from the collection when 
+            # first requested
+            df = frank.dataloader.load_data(self.name)
+            for record in df.to_dict('records'):
+                records[self.key(record)] = record
+        self.records = records
+
+    def key(self, record: dict):
+        return tuple(record[k] for k in self.key_fields)
+
+    def get(self, key: tuple):
+        ''' Get a copy of the record with the key or None '''
+        with self.lock:
+            self._load()
+            if key not in self.records and config['use_db']:
+                client = mongo.getClient()
+                record = client[config['mongo_db']][self.collection].find_one(
+                    dict(zip(self.key_fields, key)), {'_id': False})
+                self.records[key] = record
+            record = self.records.get(key)
+        return dict(record) if record else None
+
+    def put(self, record: dict, invalidate=True):
+        ''' Save a record; it is written back on the next flush '''
+        self.update_posteriors([record], invalidate)
+
+    def update_posteriors(self, records: list, invalidate=True):
+        ''' Save many updated records at once.
+
+        Cached answers are invalidated if a stored value changes, unless 
+        `invalidate` is False, e.g. for the default records saved when a 
+        prior is first requested.
+        '''
+        if not records:
+            return
+        changed = False
+        with self.lock:
+            self._load()
+            for record in records:
+                key = self.key(record)
+                current = self.records.get(key) or {}
+                changed = changed or any(
+                    k != 'lastModified' and current.get(k) != v for k, v in record.items())
+                self.records[key] = {**current, **record}
+                self.dirty.add(key)
+            self._schedule_flush()
+        if invalidate and changed:
+            frank.cache.answers.invalidate()
+
+    def flush(self):
+        ''' Write the dirty records back to the dataset or collection '''
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            dirty, self.dirty = self.dirty, set()
+            try:
+                if config['use_db']:
+                    operations = [UpdateOne(dict(zip(self.key_fields, key)),
+                                          {'$set': self.records[key]}, upsert=True)
+                                for key in dirty]
+                    client = mongo.getClient()
+                    client[config['mongo_db']][self.collection].bulk_write(
+                        operations, ordered=False)
+                else:
+                    df = pd.DataFrame(list(self.records.values()))
+                    frank.dataloader.update_data(df, self.name)
+            except Exception as ex:
+                # keep the records dirty and retry after the flush interval
+                self.dirty |= dirty
+                self._schedule_flush()
+                print(f"Error saving {self.name}: {str(ex)}")
+
+    def _schedule_flush(self):
+        if self.timer is None:
+            self.timer = threading.Timer(
+                config['prior_flush_interval'], self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def reset(self):
+        ''' Drop the records held in memory without saving them '''
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.records = None
+            self.dirty = set()
+
+
+source_priors = PriorStore('source_priors', 'sourcepriors', ['source'])
+predicate_priors = PriorStore(
+    'predicate_priors', 'predicatepriors', ['source', 'predicate'])
+
+
+@atexit.register
+def flush():
+    ''' Write back all pending prior updates '''
+    source_priors.flush()
+    predicate_priors.flush()
@@ -12,12 +12,8 @@ import math
 import statistics
 from frank.config import config
 import frank.uncertainty.sourcePrior as sourcePrior
-from frank.kb import mongo
-import frank.dataloader
+import frank.uncertainty.priorStore as priorStore
 
-# client = MongoClient(host=config["mongo_host"], port=config["mongo_port"])
-client = mongo.getClient()
-db = client[config["mongo_db"]]
 collectionName = "predicatepriors"
 defaultMean = 1e7
 defaultVariance = math.pow(1e7, 2)
@@ -32,88 +28,48 @@ class PropertyPrior():
         self.variance = variance
         self.lastModified = lastModified
 
-    def save(self):
+    def save(self, invalidate=True):
         """
         Save or update the prior object
         """
         if config["update_priors"] == False or self.source == "":
             return
-        if config["use_db"]:
-            return self.save_to_db()
-        else:
-            df = frank.dataloader.load_predicate_priors()
-            columns = ['source', 'predicate',
-                       'mean', 'variance', 'lastModified']
-            data = [self.source, self.property, self.mean,
-                    self.variance, self.lastModified.utcnow()]
-            res = df.loc[(df.source == self.source) &
-                         (df.predicate == self.property)]
-            if len(res) > 0:
-                result = df.loc[(df.source == self.source) & (df.predicate == self.property),
-                                columns] = data
-            else:
-                df2 = pd.DataFrame([data], columns=columns)
-                df = df.append(df2, ignore_index=True)
-            frank.dataloader.save_predicate_priors(df)
-            return True
+        priorStore.predicate_priors.put(self.record(), invalidate)
+        return True
 
     def save_to_db(self):
         """
         Save or update the prior object
         """
-        if config["update_priors"] == False or self.source == "":
-            return
-        # do upsert
-        result = db[collectionName].update_one(
-            {"source": self.source, "predicate": self.property},
-            {"$set": {"source": self.source, "predicate": self.property,
-                      "mean": self.mean, "variance": self.variance,
-                      "lastModified": self.lastModified.utcnow()}},
-            upsert=True
-        )
-        return result
+        # the prior store upserts into the collection when `use_db` is set
+        return self.save()
+
+    def record(self):
+        return {'source': self.source, 'predicate': self.property, 'mean': self.mean,
+                'variance': self.variance, 'lastModified': self.lastModified.utcnow()}
 
     def get_prior(self, source: str, property: str):
         """
         Retrieve a prior object for the requested knowledge source.
         """
-        if config["use_db"]:
-            return self.getPrior_from_db()
+        prior = PropertyPrior(
+            source, property, mean=defaultMean, variance=defaultVariance)
+        record = priorStore.predicate_priors.get((source, property))
+        if record:
+            prior.source = record['source']
+            prior.mean = record['mean']
+            prior.variance = record['variance']
         else:
-            prior = PropertyPrior(
-                source, property, mean=defaultMean, variance=defaultVariance)
-            df = frank.dataloader.load_predicate_priors()
-            results = df.loc[(df.source == source) & (df.predicate == property),
-                             ['source', 'mean', 'variance']]
-            if len(results) > 0:
-                record = results.head().to_numpy()
-                prior.source = record[0][0]
-                prior.mean = record[0][1]
-                prior.variance = record[0][2]
-            else:
-                # if no stored prior, save the default prior
-                self.save()
-            return prior
+            # if no stored prior, save the default prior; answers computed 
+            # so far used it already
+            prior.save(invalidate=False)
+        return prior
 
     def get_prior_from_db(self, source: str, property: str):
         """
         Retrieve a prior object for the requested knowledge source.
         """
-        prior = PropertyPrior(
-            source, property, mean=defaultMean, variance=defaultVariance)
-        results = db[collectionName].find(
-            {"source": source, "predicate": property})
-        for record in results:
-            prior.source = record["source"]
-            prior.mean = record["mean"]
-            prior.variance = record["variance"]
-
-        # if no prior retrieved for the source, save the prior object
-        #  containing the default values
-        if results.retrieved <= 0:
-            self.save()
-
-        return prior
+        return self.get_prior(source, property)
 
     def posterior(self, dataPoints, knownVariance):
         """
@@ -0,0 +1,292 @@
+'''
+File: columnar.py
+Description: Columnar on-disk format for datasets, memory-mapped on load.
+
+A table is a directory with one .npy file per column and a meta.json
+listing the columns. Numeric and boolean columns are stored as they are,
+datetime columns as int64 nanoseconds and string columns as one buffer of
+UTF-8 bytes with the offsets of the strings in it and a mask of missing
+values. Columns holding other objects are pickled. Column files are loaded
+with mmap, so processes reading the same table share its pages.
+'''
+
+import os
+import json
+import uuid
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, register_extension_dtype
+
+META_FILE = 'meta.json'
+
+
+def write_table(df: pd.DataFrame, directory: str):
+    ''' Write a dataframe as a columnar table.
+    New column files are written under a new version before meta.json is
+    replaced, so readers never see a partly written table.
+    '''
+    os.makedirs(directory, exist_ok=True)
+    version = uuid.uuid4().hex[:8]
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        column = {'name': str(name), 'file': f'{i}.{version}.npy'}
+        if pd.api.types.is_bool_dtype(series.dtype) or \
+                pd.api.types.is_numeric_dtype(series.dtype):
+            column['kind'] = 'numeric'
+            values = series.to_numpy()
+        elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+            column['kind'] = 'datetime'
+            values = pd.to_datetime(series).to_numpy().astype('datetime64[ns]').view('int64')
+        else:
+            strings = series.array if isinstance(series.array, StringColumn) else None
+            if strings is None:
+                objects = series.astype(object)
+                if all(isinstance(x, str) for x in objects[~series.isna().to_numpy()]):
+                    strings = StringColumn.from_strings(objects)
+            if strings is not None:
+                column['kind'] = 'string'
+                column['offsets'] = f'{i}.{version}.offsets.npy'
+                column['mask'] = f'{i}.{version}.mask.npy'
+                values = strings.data
+                np.save(os.path.join(directory, column['offsets']), strings.offsets)
+                np.save(os.path.join(directory, column['mask']), strings.mask)
+            else:
+                # values that are not strings are kept as they are
+                column['kind'] = 'object'
+                values = objects.to_numpy()
+        np.save(os.path.join(directory, column['file']), values,
+                allow_pickle=column['kind'] == 'object')
+        columns.append(column)
+
+    meta_path = os.path.join(directory, META_FILE)
+    old_files = set()
+    if os.path.isfile(meta_path):
+        old_files = set(column_files(read_meta(directory)))
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': version, 'rows': len(df), 'columns': columns}, f)
+    os.replace(tmp_path, meta_path)
+    # open memory maps of the old files stay valid after they are removed
+    for name in old_files:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def read_meta(directory: str):
+    with open(os.path.join(directory, META_FILE)) as f:
+        return json.load(f)
+
+
+def column_files(meta: dict):
+    files = []
+    for column in meta['columns']:
+        files.append(column['file'])
+        for extra in ['offsets', 'mask']:
+            if extra in column:
+                files.append(column[extra])
+    return files
+
+
+@register_extension_dtype
+class StringColumnDtype(ExtensionDtype):
+    ''' dtype of the string columns of a table '''
+    name = 'columnar_string'
+    type = str
+    kind = 'O'
+    na_value = np.nan
+
+    @classmethod
+    def construct_array_type(cls):
+        return StringColumn
+
+
+class StringColumn(ExtensionArray):
+    ''' A string column of a table: one buffer of UTF-8 bytes, the offsets
+    of the strings in it and a mask of missing values, as memory-mapped.
+
+    Strings are decoded one at a time when they are accessed, and rows
+    are selected and compared in their encoded form, so only the rows that
+    are used are copied out of the memory map. The buffers are never
+    written to; setting values replaces them.
+    '''
+
+    def __init__(self, data, offsets, mask):
+        self.data = data
+        self.offsets = offsets
+        self.mask = mask
+
+    @classmethod
+    def from_strings(cls, values):
+        ''' Encode a sequence of strings and missing values '''
+        values = list(values)
+        mask = np.array([pd.isna(x) for x in values], dtype=bool)
+        encoded = [b'' if m else str(x).encode('utf-8') for x, m in zip(values, mask)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(x) for x in encoded), dtype=np.int64, count=len(encoded)),
+                  out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets, mask)
+
+    @classmethod
+    def _from_sequence(cls, scalars, dtype=None, copy=False):
+        return cls.from_strings(scalars)
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls.from_strings(values)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        to_concat = list(to_concat)
+        if not to_concat:
+            return cls.from_strings([])
+        if len(to_concat) == 1:
+            return to_concat[0].copy()
+        starts = np.cumsum([0] + [len(x.data) for x in to_concat[:-1]])
+        offsets = np.concatenate([to_concat[0].offsets[:1]] +
+                                 [x.offsets[1:] - x.offsets[0] + start
+                                  for x, start in zip(to_concat, starts)])
+        data = np.concatenate([x.data[x.offsets[0]:x.offsets[-1]] for x in to_concat])
+        return cls(data, offsets - offsets[0], np.concatenate([x.mask for x in to_concat]))
+
+    @property
+    def dtype(self):
+        return StringColumnDtype()
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes + self.mask.nbytes
+
+    def __len__(self):
+        return len(self.mask)
+
+    def _decode(self, i):
+        if self.mask[i]:
+            return np.nan
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def _rows(self, rows):
+        ''' Copy the given rows into a new column; a run of rows is a view '''
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and rows[-1] - rows[0] == len(rows) - 1 and (np.diff(rows) == 1).all():
+            start, end = rows[0], rows[-1] + 1
+            offsets = self.offsets[start:end + 1]
+            return StringColumn(self.data[offsets[0]:offsets[-1]],
+                                offsets - offsets[0] if offsets[0] else offsets,
+                                self.mask[start:end])
+        starts = np.asarray(self.offsets[rows])
+        lengths = np.asarray(self.offsets[rows + 1]) - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+        return StringColumn(np.asarray(self.data[positions]), offsets,
+                            np.asarray(self.mask[rows]))
+
+    def __getitem__(self, item):
+        if pd.api.types.is_integer(item):
+            return self._decode(range(len(self))[item])
+        if not isinstance(item, slice):
+            item = pd.api.indexers.check_array_indexer(self, item)
+        return self._rows(np.arange(len(self))[item])
+
+    def __setitem__(self, key, value):
+        strings = np.array(self, dtype=object)
+        strings[key] = value
+        column = StringColumn.from_strings(strings)
+        self.data, self.offsets, self.mask = column.data, column.offsets, column.mask
+
+    def __array__(self, dtype=None, copy=None):
+        strings = np.empty(len(self), dtype=object)
+        for i in range(len(self)):
+            strings[i] = self._decode(i)
+        return strings if dtype is None else strings.astype(dtype)
+
+    def __eq__(self, other):
+        if isinstance(other, (pd.Series, pd.Index, pd.DataFrame)):
+            return NotImplemented
+        if isinstance(other, str):
+            encoded = np.frombuffer(other.encode('utf-8'), dtype=np.uint8)
+            lengths = np.diff(self.offsets)
+            result = (lengths == len(encoded)) & ~np.asarray(self.mask)
+            rows = np.nonzero(result)[0]
+            if len(rows) and len(encoded):
+                # compare the bytes of the strings of the same length
+                positions = np.asarray(self.offsets[rows])[:, None] + np.arange(len(encoded))
+                result[rows] = (np.asarray(self.data[positions]) == encoded).all(axis=1)
+            return result
+        if pd.api.types.is_scalar(other):
+            return np.zeros(len(self), dtype=bool)
+        return np.array(self, dtype=object) == np.asarray(other, dtype=object)
+
+    def isna(self):
+        return np.array(self.mask, dtype=bool)
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        indices = np.asarray(indices, dtype=np.int64)
+        if not allow_fill:
+            return self._rows(np.arange(len(self))[indices])
+        if (indices < -1).any():
+            raise ValueError('Invalid value in indices for take with allow_fill')
+        fill = indices == -1
+        if len(self) == 0 or (fill.any() and not pd.isna(fill_value)):
+            strings = np.array(self, dtype=object)
+            return StringColumn.from_strings(
+                [fill_value if i == -1 else strings[i] for i in indices])
+        column = self._rows(np.where(fill, 0, indices))
+        column.mask = column.mask | fill
+        return column
+
+    def copy(self):
+        # the buffers are never written to, so they can be shared
+        return StringColumn(self.data, self.offsets, self.mask)
+
+
+def read_column(directory: str, column: dict):
+    ''' Memory-map a column of a table '''
+    def load(name):
+        return np.load(os.path.join(directory, column[name]), mmap_mode='r')
+    if column['kind'] == 'object':
+        return np.load(os.path.join(directory, column['file']), allow_pickle=True)
+    values = load('file')
+    if column['kind'] == 'datetime':
+        return values.view('datetime64[ns]')
+    if column['kind'] == 'string':
+        return StringColumn(values, load('offsets'), load('mask'))
+    return values
+
+
+def read_columns(directory: str):
+    ''' Memory-map the columns of a table.
+    Returns a dict keyed by column name of numpy arrays, or of
+    `StringColumn`s for string columns, none of which are copied into
+    memory.
+    '''
+    meta = read_meta(directory)
+    return {column['name']: read_column(directory, column)
+            for column in meta['columns']}
+
+
+def read_table(directory: str):
+    ''' Read a columnar table into a dataframe.
+    Each column is its own block backed by its memory map, and string
+    columns are `StringColumn`s, so the table is shared by the processes
+    reading it rather than copied into each.
+    '''
+    meta = read_meta(directory)
+    frames = []
+    for column in meta['columns']:
+        values = read_column(directory, column)
+        if isinstance(values, StringColumn):
+            frames.append(pd.DataFrame({column['name']: values}))
+        else:
+            # a 2-d view is used as the block as it is; a dict of arrays 
+            # would be copied into one block per dtype
+            frames.append(pd.DataFrame(values.reshape(-1, 1), columns=[column['name']],
+                                       copy=False))
+    if not frames:
+        return pd.DataFrame(index=pd.RangeIndex(meta['rows']))
+    # pandas before 3 copies the blocks unless told not to
+    return pd.concat(frames, axis=1, **({} if int(pd.__version__.split('.')[0]) >= 3
+                                        else {'copy': False}))
@@ -27,7 +27,10 @@ def get_status():
 def query_frank():
     query = request.json['alist']
     session_id = request.json['sessionId']
-    Launcher().api_start(query, session_id, inference_graphs)
+    Launcher().api_start(query, session_id, inference_graphs,
+                         deadline=request.json.get('deadline'),
+                         max_kb_calls=request.json.get('maxKbCalls'),
+                         max_nodes=request.json.get('maxNodes'))
     response_data = {"session_id": session_id}
     response = Response(
         mimetype="application/json",
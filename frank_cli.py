@@ -31,9 +31,15 @@ argparser.add_argument("-f", "--file", type=str,
     help="batch file; used when evaluating multiple questions in a file")
 argparser.add_argument("-o", "--output", type=str,
     default="output.json", help="file to output batch query results to; (default = output.json)")
+argparser.add_argument("-d", "--deadline", type=float,
+    help="seconds to answer each query in; (default = query_deadline config)")
+argparser.add_argument("--max-kb-calls", type=int,
+    help="maximum KB searches per query; (default = max_kb_calls config)")
+argparser.add_argument("--max-nodes", type=int,
+    help="maximum nodes in the inference graph; (default = max_nodes config)")
 
 
-def cli(query, context={}):
+def cli(query, context={}, deadline=None, max_kb_calls=None, max_nodes=None):
     session_id = uuid.uuid4().hex
     interactive = False
     answer = None
@@ -64,7 +70,8 @@ def cli(query, context={}):
         print(f"{pcol.YELLOW} ├── query alist:{json.dumps(alist.attributes)} {pcol.RESETALL}")
         print(f"{pcol.YELLOW} └── session id:{session_id} {pcol.RESETALL}\n")
         launch = Launcher()
-        launch.start(alist, session_id, inference_graphs)
+        launch.start(alist, session_id, inference_graphs, deadline=deadline,
+                     max_kb_calls=max_kb_calls, max_nodes=max_nodes)
 
         if session_id in inference_graphs:
             answer = inference_graphs[session_id]['answer']['answer']
@@ -76,12 +83,12 @@ def cli(query, context={}):
         print("\nCould not parse question. Please try again.")
     return answer
 
-def batch(batch_file, output):
+def batch(batch_file, output, **budget):
     results = []
     with open(batch_file) as json_file:
         queries = json.load(json_file)
         for q in queries:
-            answer = cli(q['question'], q['context'])
+            answer = cli(q['question'], q['context'], **budget)
             results.append({'id': q['id'], 'answer': answer})
             with open(output, 'w') as out_file:
                 json.dump(results, out_file)
@@ -98,8 +105,10 @@ if __name__ == '__main__':
     if args.file and args.context:
         print("\nCannot use --context together with the --file flag.")  
 
+    budget = {'deadline': args.deadline, 'max_kb_calls': args.max_kb_calls,
+              'max_nodes': args.max_nodes}
     if args.file:
-        batch(args.file, args.output)
+        batch(args.file, args.output, **budget)
     else:
-        cli(args.query, args.context)
+        cli(args.query, args.context, **budget)
  
\ No newline at end of file
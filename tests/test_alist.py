@@ -5,6 +5,7 @@ from frank.alist import Attributes as tt
 from frank.alist import VarPrefix as vx
 from frank.alist import Branching as br
 from frank.alist import States as states
+import frank.context
 import unittest
 
 
@@ -116,6 +117,20 @@ class Test_Alist(unittest.TestCase):
         result = alist.get_alist_json_with_metadata()
         self.assertTrue('id' in result)
 
+    def test_copy(self):
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: '$y', tt.PROPERTY: 'P1082',
+                         tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1, '$y': 'Ghana',
+                         tt.CONTEXT: [{}, {}, {tt.TIME: '2010'}]})
+        alist.data_sources = ['wikidata']
+        copied = alist.copy()
+        copied.data_sources.append('worldbank')
+        copied.set(tt.TIME, '2011')
+        frank.context.flush(copied, [tt.TIME])
+        self.assertEqual((copied.id, copied.cost, copied.get('$y')), ('0', 0, 'Ghana'))
+        self.assertEqual(alist.data_sources, ['wikidata'])
+        self.assertEqual(alist.get(tt.CONTEXT)[2], {tt.TIME: '2010'})
+        self.assertEqual(copied.get(tt.CONTEXT)[2], {})
+
 
 if __name__ == '__main__':
     unittest.main()
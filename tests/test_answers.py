@@ -0,0 +1,36 @@
+import unittest
+from frank.alist import Alist
+from frank.alist import Attributes as tt
+import frank.cache.answers as answers
+
+
+class TestAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        answers.invalidate()
+
+    def test_key_ignores_datetime(self):
+        a1 = Alist(**{tt.ID: '0', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population', tt.OBJECT: '?x',
+                      tt.TIME: '2022', tt.OPVAR: '?x', tt.CONTEXT: [{}, {'datetime': '2022-01-01 10:00:00'}, {}]})
+        a2 = Alist(**{tt.ID: '0', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population', tt.OBJECT: '?x',
+                      tt.TIME: '2022', tt.OPVAR: '?x', tt.CONTEXT: [{}, {'datetime': '2022-06-01 12:00:00'}, {}]})
+        a3 = Alist(**{tt.ID: '0', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population', tt.OBJECT: '?x',
+                      tt.TIME: '2022', tt.OPVAR: '?x', tt.CONTEXT: [{'accuracy': 'high'}, {}, {}]})
+        self.assertEqual(answers.key(a1), answers.key(a2))
+        self.assertNotEqual(answers.key(a1), answers.key(a3))
+
+    def test_put_get_invalidate(self):
+        alist = Alist(**{tt.ID: '0', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population', tt.OBJECT: '?x',
+                         tt.TIME: '2022', tt.OPVAR: '?x'})
+        key = answers.key(alist)
+        answers.put(key, {'answer': '3022', 'alist': alist.attributes})
+        cached = answers.get(key)
+        self.assertEqual(cached['answer'], '3022')
+        cached['answer'] = ''
+        self.assertEqual(answers.get(key)['answer'], '3022')
+        answers.invalidate()
+        self.assertIsNone(answers.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
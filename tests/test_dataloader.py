@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import frank.dataloader as dataloader
+from frank.util import columnar
+
+
+class TestDataloader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_path = dataloader.data_path
+        dataloader.data_path = lambda filename: os.path.join(self.tmp.name, filename)
+        dataloader.invalidate()
+        pd.DataFrame({'source': ['worldbank'], 'cov': [0.1]}).to_pickle(
+            os.path.join(self.tmp.name, 'source_priors.pickle'))
+
+    def tearDown(self):
+        dataloader.data_path = self.data_path
+        dataloader.invalidate()
+        self.tmp.cleanup()
+
+    def test_load_once(self):
+        df1 = dataloader.load_source_priors()
+        df2 = dataloader.load_source_priors()
+        self.assertIs(df1, df2)
+
+    def test_reload_on_change(self):
+        df1 = dataloader.load_source_priors()
+        pd.DataFrame({'source': ['wikidata', 'worldbank'], 'cov': [0.5, 0.1]}).to_pickle(
+            os.path.join(self.tmp.name, 'source_priors.pickle'))
+        df2 = dataloader.load_source_priors()
+        self.assertIsNot(df1, df2)
+        self.assertEqual(len(df2), 2)
+
+    def test_update(self):
+        df = dataloader.load_source_priors().copy()
+        df.loc[df.source == 'worldbank', 'cov'] = 0.2
+        dataloader.save_source_priors(df)
+        self.assertIs(dataloader.load_source_priors(), df)
+        dataloader.invalidate()
+        self.assertEqual(dataloader.load_source_priors()['cov'][0], 0.2)
+
+    def test_columnar(self):
+        df = pd.DataFrame({'source': ['worldbank', None], 'cov': [0.1, 0.5],
+                           'count': [1, 2], 'lastModified': pd.to_datetime(['2020-01-01', None])})
+        df.to_pickle(os.path.join(self.tmp.name, 'source_priors.pickle'))
+        dataloader.convert_data('source_priors')
+        self.assertTrue(dataloader.dataset_file('source_priors').endswith('meta.json'))
+        loaded = dataloader.load_source_priors()
+        self.assertEqual(list(loaded.columns), list(df.columns))
+        self.assertEqual(loaded['source'][0], 'worldbank')
+        self.assertTrue(pd.isna(loaded['source'][1]))
+        self.assertEqual(list(loaded['cov']), [0.1, 0.5])
+        self.assertEqual(loaded['lastModified'][0], pd.Timestamp('2020-01-01'))
+        self.assertTrue(pd.isna(loaded['lastModified'][1]))
+
+        # updates are written to both formats
+        updated = loaded.copy()
+        updated.loc[0, 'cov'] = 0.2
+        dataloader.save_source_priors(updated)
+        dataloader.invalidate()
+        self.assertEqual(dataloader.load_source_priors()['cov'][0], 0.2)
+        self.assertEqual(len([f for f in os.listdir(dataloader.columnar_path('source_priors'))
+                              if f.endswith('.npy')]), 6)
+
+    def test_columnar_read(self):
+        df = pd.DataFrame({'label': ['population', None, 'área'],
+                           'aliases': [['pop'], None, 'area'], 'count': [1, 2, 3],
+                           'cov': [0.1, 0.2, 0.3]})
+        directory = os.path.join(self.tmp.name, 'props.columns')
+        columnar.write_table(df, directory)
+        columns = columnar.read_columns(directory)
+        self.assertIsInstance(columns['count'], np.memmap)
+        self.assertIsInstance(columns['label'].data, np.memmap)
+        self.assertEqual(columns['label'][2], 'área')
+        self.assertTrue(pd.isna(columns['label'][1]))
+        # values that are not strings are not turned into strings
+        loaded = columnar.read_table(directory)
+        self.assertEqual(list(loaded['aliases']), [['pop'], None, 'area'])
+        self.assertEqual(list(loaded['count']), [1, 2, 3])
+        # the columns of the frame are backed by the memory maps
+        for name in ['count', 'cov']:
+            values = loaded[name].to_numpy()
+            while values is not None and not isinstance(values, np.memmap):
+                values = values.base
+            self.assertIsInstance(values, np.memmap)
+        self.assertIsInstance(loaded['label'].array.data, np.memmap)
+
+    def test_columnar_strings(self):
+        df = pd.DataFrame({'name': ['Ghana', None, 'Côte d\'Ivoire', 'Gabon'],
+                           'id': ['GHA', 'XXX', 'CIV', 'GAB']})
+        directory = os.path.join(self.tmp.name, 'countries.columns')
+        columnar.write_table(df, directory)
+        loaded = columnar.read_table(directory)
+        self.assertTrue(pd.isna(loaded['name'][1]))
+        self.assertEqual(loaded[loaded['name'] == 'Côte d\'Ivoire']['id'].iloc[0], 'CIV')
+        self.assertEqual(list(loaded[loaded['name'] != 'Ghana']['id']), ['XXX', 'CIV', 'GAB'])
+        self.assertEqual(loaded.to_dict('records')[0], {'name': 'Ghana', 'id': 'GHA'})
+        self.assertEqual(list(loaded.sort_values('id')['id']), ['CIV', 'GAB', 'GHA', 'XXX'])
+        updated = loaded.copy()
+        updated.loc[0, 'name'] = 'Republic of Ghana'
+        self.assertEqual(loaded['name'][0], 'Ghana')
+        self.assertEqual(list(pd.concat([updated, loaded])['name'].iloc[[0, 4]]),
+                         ['Republic of Ghana', 'Ghana'])
+        columnar.write_table(updated, directory)
+        self.assertEqual(columnar.read_table(directory)['name'][0], 'Republic of Ghana')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -108,6 +108,13 @@ class Test_Graph(unittest.TestCase):
         alist = graph.alist('111')
         self.assertTrue(alist.id == '111')
     
+    def test_get_alist_view(self):
+        graph = self.create_graph()
+        alist = graph.alist('111')
+        alist.instantiate_variable('?x', 42)
+        self.assertEqual(graph.nodes['111']['?x'], 42)
+        self.assertEqual(graph.child_alists('1')[0].get('?x'), 42)
+
     def test_get_leaves(self):
         graph = self.create_graph()
         leaves = graph.leaf_nodes()
@@ -134,6 +141,39 @@ class Test_Graph(unittest.TestCase):
         frontier3 = graph.frontier(state=states.REDUCIBLE)
         self.assertTrue(len(frontier1)==1 and len(frontier2)==1)
 
+    def test_frontier_batch(self):
+        graph = self.create_graph2()
+        batch = graph.frontier(size=2)
+        self.assertEqual(len(batch), 2)
+        self.assertTrue(batch[0].cost <= batch[1].cost)
+        self.assertTrue(all(graph.alist(x.id).state == states.EXPLORING for x in batch))
+        self.assertEqual(len(graph.frontier(size=2)), 0)
+
+    def test_frontier_after_update(self):
+        graph = self.create_graph2()
+        leaf = graph.alist('112')
+        leaf.cost = 0.5
+        graph.add_alist(leaf)
+        self.assertEqual(graph.frontier(update_state=False)[0].id, '112')
+        graph.prune('21111')
+        frontier = graph.frontier(size=3, state=states.UNEXPLORED)
+        self.assertEqual([x.id for x in frontier], ['112', '111'])
+
+    def test_frontier_heap_size(self):
+        graph = self.create_graph2()
+        leaf = graph.alist('112')
+        size = len(graph.frontier_heaps[states.UNEXPLORED])
+        # re-adding an unchanged node does not push a new entry
+        for _ in range(100):
+            graph.add_alist(leaf)
+        self.assertEqual(len(graph.frontier_heaps[states.UNEXPLORED]), size)
+        # stale entries of changed nodes are compacted away
+        for i in range(200):
+            leaf.cost = i
+            graph.add_alist(leaf)
+        self.assertLessEqual(len(graph.frontier_heaps[states.UNEXPLORED]), 64)
+        self.assertEqual(graph.frontier(update_state=False, size=3)[-1].id, '112')
+
     def test_blanket(self):
         graph = self.create_graph2()
         blanket = graph.blanket_subgraph('111', ancestor_length=1, descendant_length=1)
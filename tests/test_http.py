@@ -0,0 +1,147 @@
+import time
+import threading
+import unittest
+import http.server
+from requests.exceptions import Timeout
+from frank import config
+from frank.kb.utils.requests import Client, HostLimiter
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    hits = 0
+    slow_hits = 0
+
+    def do_GET(self):
+        if self.path.startswith('/throttled'):
+            Handler.hits += 1
+            self.send_response(429 if Handler.hits == 1 else 200)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+            return
+        if self.path.startswith('/slow'):
+            Handler.slow_hits += 1
+            time.sleep(0.2)
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+            return
+        Handler.hits += 1
+        # fail the first request to exercise the retries
+        self.send_response(503 if Handler.hits == 1 else 200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        Handler.hits = 0
+        Handler.slow_hits = 0
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        self.client = Client()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry(self):
+        response = self.client.get(self.url, params={'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Handler.hits, 2)
+
+    def test_session_per_host(self):
+        self.client.get(self.url)
+        self.client.get(self.url + 'other')
+        self.assertEqual(len(self.client.sessions), 1)
+
+    def test_coalescing(self):
+        responses = []
+        def get(params):
+            responses.append(self.client.get(self.url + 'slow', params=params))
+        threads = [threading.Thread(target=get, args=(params,)) for params in
+                   [{'a': 1, 'b': 2}, {'b': 2, 'a': 1}, {'a': 1, 'b': 2}, {'a': 2}]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([r.json() for r in responses], [{}] * 4)
+        self.assertEqual(Handler.slow_hits, 2)
+        self.assertEqual(self.client.coalesced, 2)
+        self.assertEqual(self.client.inflight, {})
+
+    def test_retry_after(self):
+        start = time.time()
+        response = self.client.get(self.url + 'throttled')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Handler.hits, 2)
+        self.assertGreaterEqual(time.time() - start, 1)
+        limiter = self.client.host_limits[f'127.0.0.1:{self.server.server_address[1]}']
+        self.assertLess(limiter.rate, 10)
+
+
+class TestHostLimiter(unittest.TestCase):
+
+    def test_aimd(self):
+        limiter = HostLimiter(rate=10, concurrency=4)
+        limiter.acquire()
+        limiter.release(429, 0.1)
+        self.assertEqual((limiter.limit, limiter.rate), (2, 5))
+        # one decrease per second
+        limiter.acquire()
+        limiter.release(503, 0.1)
+        self.assertEqual((limiter.limit, limiter.rate), (2, 5))
+        limiter.acquire()
+        limiter.release(200, 0.1)
+        self.assertEqual((limiter.limit, limiter.rate), (2.5, 5.2))
+
+    def test_concurrency_limit(self):
+        limiter = HostLimiter(rate=100, concurrency=2)
+        limiter.tokens = 3
+        limiter.acquire()
+        limiter.acquire()
+        acquired = threading.Event()
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+        threading.Thread(target=acquire, daemon=True).start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(200, 0.01)
+        self.assertTrue(acquired.wait(1))
+
+    def test_pacing(self):
+        limiter = HostLimiter(rate=20, concurrency=4)
+        start = time.time()
+        for _ in range(6):
+            limiter.acquire()
+            limiter.release(200, 0.01)
+        # the bucket starts with one token
+        self.assertGreaterEqual(time.time() - start, 0.2)
+
+    def test_acquire_timeout(self):
+        limiter = HostLimiter(rate=100, concurrency=1)
+        limiter.acquire()
+        with self.assertRaises(Timeout):
+            limiter.acquire(timeout=0.1)
+        limiter.release(200, 0.01)
+        limiter.acquire(timeout=0.1)
+
+    def test_max_pause(self):
+        limiter = HostLimiter(rate=100, concurrency=1)
+        limiter.acquire()
+        limiter.release(429, 0.01, retry_after='86400')
+        self.assertLessEqual(limiter.paused_until - time.time(),
+                             config.config['http_max_pause'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
+import time
 import unittest
+from types import SimpleNamespace
+from unittest import mock
 from frank.alist import Alist
 from frank.alist import Attributes as tt, States as states
 from frank.infer import Infer
 from frank.graph import InferenceGraph
+from frank.kb.utils.cache import negative_lookups
 
 
 class Test_Inference(unittest.TestCase):
@@ -10,6 +14,7 @@ class Test_Inference(unittest.TestCase):
     def setUp(self):
         G = InferenceGraph()
         self.infer = Infer(G)
+        negative_lookups.clear()
         self.alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
                               tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
 
@@ -44,6 +49,241 @@ class Test_Inference(unittest.TestCase):
         # infer = Infer().runFrank(alist)
         self.assertTrue(True)
 
+    def test_search_source(self):
+        def find_property_values(alist, search_element):
+            fact = alist.copy()
+            fact.set(tt.OBJECT, '24200000')
+            fact.data_sources = ['testsource']
+            return [fact]
+        source = SimpleNamespace(
+            search_properties=lambda term: [('TEST.POP', term, 1)],
+            find_property_values=find_property_values)
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population',
+                         tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        facts = self.infer.search_source(
+            alist, 'testsource', {'fn': source, 'trust': 'high'})
+        self.assertEqual(len(facts), 1)
+        self.assertEqual(facts[0][1], tt.OBJECT)
+        self.assertEqual(self.infer.property_refs['population'][0][1], 'testsource')
+
+    def test_search_temporal_siblings(self):
+        calls = {'single': 0, 'batch': 0}
+        def find_property_values(alist, search_element):
+            calls['single'] += 1
+            return []
+        def find_property_object_batch(alist, times):
+            calls['batch'] += 1
+            facts = {}
+            for t in times:
+                fact = alist.copy()
+                fact.set(tt.OBJECT, str(1000 + int(t)))
+                fact.set(tt.TIME, t)
+                facts[t] = [fact]
+            return facts
+        source = SimpleNamespace(
+            search_properties=lambda term: [('TEST.POP', term, 1)],
+            find_property_values=find_property_values,
+            find_property_object_batch=find_property_object_batch)
+        G = self.infer.G
+        parent = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population',
+                          tt.OBJECT: '?x', tt.TIME: '2020', tt.OPVAR: '?x', tt.COST: 1})
+        G.add_alist(parent)
+        children = []
+        for t in ['2017', '2018', '2019']:
+            child = parent.copy()
+            child.set(tt.TIME, t)
+            G.link(parent, child)
+            children.append(child)
+        for child in children:
+            facts = self.infer.search_source(
+                G.alist(child.id), 'testsource', {'fn': source, 'trust': 'high'})
+            self.assertEqual(facts[0][0].get(tt.OBJECT),
+                             str(1000 + int(child.get(tt.TIME))))
+        self.assertEqual(calls, {'single': 0, 'batch': 1})
+
+    def test_search_temporal_siblings_batch_fails(self):
+        calls = {'single': 0, 'batch': 0}
+        def find_property_values(alist, search_element):
+            calls['single'] += 1
+            fact = alist.copy()
+            fact.set(tt.OBJECT, str(1000 + int(alist.get(tt.TIME))))
+            return [fact]
+        def find_property_object_batch(alist, times):
+            calls['batch'] += 1
+            raise ValueError('batch lookup failed')
+        source = SimpleNamespace(
+            search_properties=lambda term: [('TEST.POP', term, 1)],
+            find_property_values=find_property_values,
+            find_property_object_batch=find_property_object_batch)
+        G = self.infer.G
+        parent = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population',
+                          tt.OBJECT: '?x', tt.TIME: '2020', tt.OPVAR: '?x', tt.COST: 1})
+        G.add_alist(parent)
+        children = []
+        for t in ['2017', '2018', '2019']:
+            child = parent.copy()
+            child.set(tt.TIME, t)
+            G.link(parent, child)
+            children.append(child)
+        for child in children:
+            facts = self.infer.search_source(
+                G.alist(child.id), 'testsource', {'fn': source, 'trust': 'high'})
+            self.assertEqual(facts[0][0].get(tt.OBJECT),
+                             str(1000 + int(child.get(tt.TIME))))
+        self.assertEqual(calls['single'], 3)
+        self.assertEqual(self.infer.prefetched, {})
+
+    def test_negative_lookups(self):
+        calls = []
+        def find_property_values(alist, search_element):
+            calls.append(alist.get(tt.TIME))
+            if alist.get(tt.TIME) == '2030':
+                # a failed lookup is not remembered as an empty result
+                return None
+            return []
+        source = SimpleNamespace(
+            search_properties=lambda term: [('TEST.POP', term, 1)],
+            find_property_values=find_property_values)
+        for t in ['2025', '2025', '2030', '2030']:
+            alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'population',
+                             tt.OBJECT: '?x', tt.TIME: t, tt.OPVAR: '?x', tt.COST: 1})
+            self.assertEqual(self.infer.search_source(
+                alist, 'testsource', {'fn': source, 'trust': 'high'}), [])
+        self.assertEqual(calls, ['2025', '2030', '2030'])
+        alist.set(tt.TIME, '2025')
+        self.assertTrue(self.infer.known_empty(alist, 'testsource'))
+        self.assertFalse(self.infer.known_empty(alist, 'worldbank'))
+        # the same time injected from the context is a different lookup
+        alist.set(tt.CONTEXT, [{}, {tt.TIME: '2025'}, {}])
+        self.assertFalse(self.infer.known_empty(alist, 'testsource'))
+
+    def test_reduce_after_prune(self):
+        G = self.infer.G
+        parent = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                          tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1,
+                          tt.OP: 'max'})
+        G.add_alist(parent)
+        children = []
+        for i, value in enumerate(['100', '200', '300']):
+            child = Alist(**{tt.ID: str(i + 2), tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                             tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1,
+                             tt.COV: 0.1})
+            child.instantiate_variable('?x', value)
+            child.state = states.REDUCIBLE
+            G.link(parent, child)
+            children.append(child)
+        self.assertTrue(self.infer.aggregate(parent.id))
+        self.assertEqual(float(G.alist(parent.id).instantiation_value('?x')), 300)
+
+        G.prune(children[2].id)
+        self.assertEqual(len(G.child_ids(parent.id)), 2)
+        self.infer.aggregate(parent.id)
+        self.assertEqual(float(G.alist(parent.id).instantiation_value('?x')), 200)
+
+        # a child that leaves the reducible states no longer counts either
+        ignored = G.alist(children[1].id)
+        ignored.state = states.IGNORE
+        G.add_alist(ignored)
+        self.infer.aggregate(parent.id)
+        self.assertEqual(float(G.alist(parent.id).instantiation_value('?x')), 100)
+
+        G.prune(parent.id)
+        self.assertNotIn(parent.id, self.infer.reduce_states)
+
+    def test_subgoal_tabling(self):
+        G = self.infer.G
+        root = Alist(**{tt.ID: '0', tt.SUBJECT: 'Africa', tt.PROPERTY: 'P1082',
+                        tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        self.infer.enqueue_root(root)
+        leader = Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                          tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        follower = Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                            tt.OBJECT: '?y', tt.TIME: '2010', tt.OPVAR: '?y', tt.COST: 1})
+        G.link(root, leader)
+        G.link(root, follower)
+        self.assertEqual(leader.signature(), follower.signature())
+        self.assertFalse(self.infer.follow_subgoal(leader))
+        self.assertTrue(self.infer.follow_subgoal(follower))
+        self.assertEqual(G.alist(follower.id).state, states.EXPLORED)
+
+        resolved = G.alist(leader.id)
+        resolved.instantiate_variable('?x', 24200000)
+        resolved.data_sources = ['worldbank']
+        resolved.state = states.REDUCIBLE
+        self.infer.resolve_subgoal(resolved)
+        tabled = G.alist(follower.id)
+        self.assertEqual(tabled.instantiation_value(tabled.get(tt.OPVAR)), 24200000)
+        self.assertEqual(tabled.state, states.REDUCIBLE)
+        self.assertEqual(tabled.data_sources, ['worldbank'])
+
+    def test_subgoal_leader_fails(self):
+        G = self.infer.G
+        root = Alist(**{tt.ID: '0', tt.SUBJECT: 'Africa', tt.PROPERTY: 'P1082',
+                        tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        self.infer.enqueue_root(root)
+        leader = Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                          tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        followers = [Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                              tt.OBJECT: v, tt.TIME: '2010', tt.OPVAR: v, tt.COST: 1})
+                     for v in ['?y', '?z']]
+        for a in [leader] + followers:
+            G.link(root, a)
+        self.assertFalse(self.infer.follow_subgoal(leader))
+        self.assertTrue(self.infer.follow_subgoal(followers[0]))
+        # the leader finds nothing and has no decompositions
+        with mock.patch.object(self.infer, 'search_kb', return_value=False), \
+                mock.patch.object(self.infer, 'get_map_strategy', return_value=[]):
+            self.infer.run_frank(G.alist(leader.id))
+        self.assertEqual(G.alist(followers[0].id).state, states.UNEXPLORED)
+        # the released follower resolves the sub-goal itself
+        self.assertFalse(self.infer.follow_subgoal(G.alist(followers[0].id)))
+
+        # followers of a pruned leader are released too
+        self.assertTrue(self.infer.follow_subgoal(followers[1]))
+        G.prune(followers[0].id)
+        self.assertEqual(G.alist(followers[1].id).state, states.UNEXPLORED)
+
+    def test_subgoal_leader_child_fails(self):
+        G = self.infer.G
+        root = Alist(**{tt.ID: '0', tt.SUBJECT: 'Africa', tt.PROPERTY: 'P1082',
+                        tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        self.infer.enqueue_root(root)
+        leader = Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                          tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        follower = Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                            tt.OBJECT: '?y', tt.TIME: '2010', tt.OPVAR: '?y', tt.COST: 1})
+        G.link(root, leader)
+        G.link(root, follower)
+        self.assertFalse(self.infer.follow_subgoal(leader))
+        self.assertTrue(self.infer.follow_subgoal(follower))
+        # the leader is decomposed into a single child
+        leader = G.alist(leader.id)
+        leader.state = states.EXPLORED
+        G.add_alist(leader)
+        child = Alist(**{tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082', tt.OBJECT: '?x',
+                         tt.TIME: '2009', tt.OPVAR: '?x', tt.COST: 1})
+        G.link(leader, child)
+        self.assertEqual(G.alist(follower.id).state, states.EXPLORED)
+        # the child finds nothing and has no decompositions
+        with mock.patch.object(self.infer, 'search_kb', return_value=False), \
+                mock.patch.object(self.infer, 'get_map_strategy', return_value=[]):
+            self.infer.run_frank(G.alist(child.id))
+        self.assertEqual(G.alist(follower.id).state, states.UNEXPLORED)
+        self.assertNotIn(leader.id, self.infer.subgoal_followers)
+
+    def test_search_budget(self):
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: '__test',
+                         tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        self.infer.max_kb_calls = 1
+        self.infer.kb_calls = 1
+        self.assertTrue(self.infer.kb_budget_exhausted())
+        self.assertFalse(self.infer.search_kb(alist))
+        self.assertEqual(self.infer.kb_calls, 1)
+
+        self.infer.deadline = time.time() - 1
+        self.assertTrue(self.infer.past_deadline())
+        self.assertEqual(self.infer.run_frank(alist), [])
+
     def test_aggregate(self):
         res = self.infer.aggregate(self.alist.id)
         self.assertTrue(res)
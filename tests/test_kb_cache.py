@@ -0,0 +1,174 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from frank.kb.utils.cache import TTLStore, DiskCache, memoize
+import frank.kb
+
+
+class TestTTLStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TTLStore('test', ttl=60, disk=False)
+        self.store.disk = DiskCache(self.tmp.name, ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_get(self):
+        self.store.put('GHA/SP.POP.TOTL', [['2010', 24000000]])
+        self.assertEqual(self.store.get('GHA/SP.POP.TOTL'), [['2010', 24000000]])
+        self.assertIsNone(self.store.get('GHA/NY.GDP.MKTP.CD'))
+
+    def test_disk_tier(self):
+        self.store.put('GHA/SP.POP.TOTL', [['2010', 24000000]])
+        self.store.clear()
+        self.assertEqual(self.store.get('GHA/SP.POP.TOTL'), [['2010', 24000000]])
+        self.assertEqual(self.store.disk.stats()['hits'], 1)
+
+    def test_expiry(self):
+        self.store.ttl = 0.05
+        self.store.put('GHA/SP.POP.TOTL', [])
+        time.sleep(0.1)
+        self.store.clear()
+        self.assertIsNone(self.store.get('GHA/SP.POP.TOTL'))
+
+    def test_get_or_load_once(self):
+        calls = []
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return [['2010', 24000000]]
+        threads = [threading.Thread(target=self.store.get_or_load,
+                                    args=('GHA/SP.POP.TOTL', loader)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(self.store.get_or_load('GHA/NY.GDP.MKTP.CD', lambda: None))
+
+    def test_get_or_load_none_once(self):
+        calls, results = [], []
+        release = threading.Event()
+        def loader():
+            calls.append(1)
+            release.wait(1)
+            return None
+        def load():
+            results.append(self.store.get_or_load('GHA/NY.GDP.MKTP.CD', loader))
+        threads = [threading.Thread(target=load) for _ in range(5)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual((len(calls), results), (1, [None] * 5))
+        self.assertEqual(self.store.loading, {})
+
+    def test_lru(self):
+        store = TTLStore('test', ttl=60, disk=False, maxsize=2)
+        store.put('Ghana', 'Q117')
+        store.put('Europe', 'Q46')
+        store.get('Ghana')
+        store.put('Africa', 'Q15')
+        self.assertEqual(list(store.memory), ['Ghana', 'Africa'])
+        self.assertIsNone(store.get('Europe'))
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.tmp.name, ttl=60, shards=4, max_bytes=4 * 4096)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_get(self):
+        self.cache.put('Ghana', {'id': 'Q117'})
+        self.assertEqual(self.cache.get('Ghana'), {'id': 'Q117'})
+        self.assertIsNone(self.cache.get('Wakanda'))
+        # another instance, as in another process, reads the same entries
+        self.assertEqual(DiskCache(self.tmp.name, shards=4).get('Ghana'), {'id': 'Q117'})
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['puts']), (1, 1, 1))
+
+    def test_expiry(self):
+        self.cache.put('Ghana', 'Q117', ttl=0.05)
+        self.cache.put('Europe', 'Q46', ttl=0)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('Ghana'))
+        self.assertEqual(self.cache.get('Europe'), 'Q46')
+        self.assertEqual(self.cache.stats()['expired'], 1)
+
+    def test_eviction(self):
+        for i in range(40):
+            self.cache.put(f'key{i}', 'x' * 1000)
+        self.assertGreater(self.cache.stats()['evictions'], 0)
+        self.assertEqual(self.cache.get('key39'), 'x' * 1000)
+        self.assertIsNone(self.cache.get('key0'))
+
+    def test_size_accounting(self):
+        cache = DiskCache(self.tmp.name, shards=1, max_bytes=1 << 20)
+        def total():
+            return cache.connections[0].execute(
+                'SELECT TOTAL(size) FROM entries').fetchone()[0]
+        cache.put('Ghana', 'x' * 1000)
+        for _ in range(5):
+            cache.put('Ghana', 'x' * 500)
+            cache.put('Europe', 'y' * 200)
+        self.assertEqual(cache.sizes[0], total())
+        cache.delete('Ghana')
+        cache.delete('Wakanda')
+        self.assertEqual(cache.sizes[0], total())
+        cache.put('Africa', 'z', ttl=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('Africa'))
+        self.assertEqual(cache.sizes[0], total())
+
+    def test_concurrent_puts(self):
+        def put(n):
+            for i in range(20):
+                self.cache.put(f'{n}/{i}', i)
+        threads = [threading.Thread(target=put, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([self.cache.get(f'{n}/19') for n in range(4)], [19] * 4)
+
+    def test_memoize(self):
+        calls = []
+        @memoize(self.cache)
+        def find(name, year=None):
+            calls.append(name)
+            return None if name == 'Wakanda' else [name, year]
+        for _ in range(2):
+            self.assertEqual(find('Ghana', year=2010), ['Ghana', 2010])
+            self.assertIsNone(find('Wakanda'))
+        self.assertEqual(calls, ['Ghana', 'Wakanda', 'Wakanda'])
+
+    def test_kb_memoize(self):
+        calls = []
+        class Source(frank.kb.KB):
+            @frank.kb.KB.memoize(lambda name: name)
+            def find(self, name):
+                calls.append(name)
+                return None
+        memo_cache = frank.kb.memo_cache
+        frank.kb.memo_cache = self.cache
+        try:
+            source = Source('test')
+            self.assertIsNone(source.find('Ghana'))
+            self.assertIsNone(source.find('Ghana'))
+        finally:
+            frank.kb.memo_cache = memo_cache
+        self.assertEqual(calls, ['Ghana'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import difflib
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from frank.kb.utils import property_index
+from frank.kb.utils.property_index import PropertyIndex
+
+
+class TestPropertyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'id': ['P1082', 'P2131', 'P2046', 'P36', 'P35', 'P1538', 'P6', 'P2044'],
+            'label': ['population', 'nominal GDP', 'area', 'capital', 'head of state',
+                      'number of households', 'head of government', 'elevation above sea level']})
+        self.index = PropertyIndex(self.df)
+
+    def scan(self, term):
+        scores = [(i, l, difflib.SequenceMatcher(None, term, l).ratio())
+                  for i, l in zip(self.df['id'], self.df['label'])]
+        scores = sorted([x for x in scores if x[2] > 0.8], key=lambda x: x[2], reverse=True)
+        return scores[:1]
+
+    def test_matches_full_scan(self):
+        for term in ['population', 'populations', 'capitol', 'head of states',
+                     'area', 'gdp', 'elevation', 'xyz']:
+            self.assertEqual(self.index.search(term), self.scan(term))
+
+    def test_limit(self):
+        results = self.index.search('head of state', threshold=0.5, limit=2)
+        self.assertEqual([x[0] for x in results], ['P35', 'P6'])
+
+
+    def test_short_label_among_distractors(self):
+        labels = [f'population {i:02d}' for i in range(70)] + ['population']
+        df = pd.DataFrame({'id': [f'P{i}' for i in range(len(labels))], 'label': labels})
+        self.assertEqual(PropertyIndex(df).search('population')[0][1], 'population')
+
+    def test_load_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            table = os.path.join(tmp, 'props.pickle')
+            self.df.to_pickle(table)
+            calls = []
+            def load_df():
+                calls.append(1)
+                return pd.read_pickle(table)
+            with mock.patch.object(property_index, 'indexes', {}), \
+                    mock.patch.object(property_index, 'index_path',
+                                      return_value=os.path.join(tmp, 'props.index.pickle')), \
+                    mock.patch('frank.dataloader.dataset_file', return_value=table):
+                index = property_index.load_index('props', load_df)
+                self.assertIs(property_index.load_index('props', load_df), index)
+                # read from disk without loading the table
+                property_index.indexes.clear()
+                self.assertEqual(property_index.load_index('props', load_df).search('population'),
+                                 index.search('population'))
+                self.assertEqual(len(calls), 1)
+                # a changed table is indexed again
+                self.df.iloc[:1].to_pickle(table)
+                self.assertEqual(property_index.load_index('props', load_df).search('area'), [])
+                self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
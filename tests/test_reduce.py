@@ -138,7 +138,39 @@ class TestReduce(unittest.TestCase):
         print(a)
         self.assertAlmostEqual(
             a.instantiation_value(tt.OPVAR), 134.89, places=2)
-    
+
+    def test_regress_incremental(self):
+        children = self.G.child_alists(self.alist.id)
+        state = {}
+        for c in children[:4]:
+            frank.reduce.regress.accumulate(state, self.alist.copy(), c)
+        frank.reduce.regress.finalize(state, self.alist.copy(), self.G)
+        for c in children[4:]:
+            frank.reduce.regress.accumulate(state, self.alist.copy(), c)
+        a = frank.reduce.regress.finalize(state, self.alist.copy(), self.G)
+        b = frank.reduce.regress.reduce(self.alist.copy(), children, self.G)
+        self.assertAlmostEqual(
+            a.instantiation_value(tt.OPVAR), b.instantiation_value(tt.OPVAR), places=6)
+        self.assertAlmostEqual(a.get(tt.COV), b.get(tt.COV), places=6)
+
+    def test_incremental_update(self):
+        children = self.G.child_alists(self.alist.id)
+        for op in [frank.reduce.sum, frank.reduce.max, frank.reduce.min,
+                   frank.reduce.mean, frank.reduce.count]:
+            state = {}
+            for c in children:
+                op.accumulate(state, self.alist.copy(), c)
+            # a child re-reduced with a new value replaces its old contribution
+            updated = children[1].copy()
+            updated.id = children[1].id
+            updated.instantiate_variable('?x', '200')
+            op.accumulate(state, self.alist.copy(), updated)
+            a = op.finalize(state, self.alist.copy(), self.G)
+            b = op.reduce(self.alist.copy(), [updated if c.id == updated.id else c
+                                              for c in children], self.G)
+            self.assertEqual(float(a.instantiation_value(tt.OPVAR)),
+                             float(b.instantiation_value(tt.OPVAR)))
+
     def test_gpregress(self):
         a = frank.reduce.gpregress.reduce(self.alist, self.G.child_alists(self.alist.id), self.G)
         print(a)
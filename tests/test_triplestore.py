@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from frank import config
+from frank.alist import Alist
+from frank.alist import Attributes as tt
+from frank.kb import triplestore
+from frank.infer import Infer
+from frank.graph import InferenceGraph
+
+NT = r'''<http://www.wikidata.org/entity/Q117> <http://www.w3.org/2000/01/rdf-schema#label> "Ghana"@en .
+<http://www.wikidata.org/entity/Q117> <http://www.w3.org/2000/01/rdf-schema#label> "Gana"@es .
+<http://www.wikidata.org/entity/Q117> <http://schema.org/name> "Ghana"@en .
+<http://www.wikidata.org/entity/Q117> <http://www.wikidata.org/prop/direct/P36> <http://www.wikidata.org/entity/Q3761> .
+<http://www.wikidata.org/entity/Q117> <http://www.wikidata.org/prop/direct/P1082> "31072940"^^<http://www.w3.org/2001/XMLSchema#decimal> .
+<http://www.wikidata.org/entity/Q3761> <http://www.w3.org/2000/01/rdf-schema#label> "Accra"@en .
+<http://www.wikidata.org/entity/Q1008> <http://www.w3.org/2000/01/rdf-schema#label> "Côte d'Ivoire"@en .
+<http://www.wikidata.org/entity/P36> <http://www.w3.org/2000/01/rdf-schema#label> "capital"@en .
+<http://www.wikidata.org/entity/P1082> <http://www.w3.org/2000/01/rdf-schema#label> "population"@en .
+<http://www.wikidata.org/entity/Q117> <http://www.wikidata.org/prop/direct-normalized/P1082> "31072940" .
+'''
+
+
+class TestTripleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = config.config['triplestore_dir']
+        config.config['triplestore_dir'] = os.path.join(self.tmp.name, 'triplestore')
+        nt_path = os.path.join(self.tmp.name, 'slice.nt')
+        with open(nt_path, 'w') as f:
+            f.write(NT)
+        self.count = triplestore.ingest([nt_path])
+        self.store = triplestore.store()
+
+    def tearDown(self):
+        config.config['triplestore_dir'] = self.directory
+        self.tmp.cleanup()
+
+    def test_ingest(self):
+        # the Spanish label, the duplicate name and the normalized claim are dropped
+        self.assertEqual(self.count, 7)
+        self.assertEqual(self.store.label(self.store.term_id('Q1008')), "Côte d'Ivoire")
+
+    def test_indexes(self):
+        ts = self.store
+        ghana, capital, accra = ts.term_id('Q117'), ts.term_id('P36'), ts.term_id('Q3761')
+        self.assertEqual(ts.triples(s=ghana, p=capital).tolist(), [[ghana, capital, accra]])
+        self.assertEqual(ts.triples(p=capital, o=accra).tolist(), [[ghana, capital, accra]])
+        self.assertEqual(ts.triples(o=accra).tolist(), [[ghana, capital, accra]])
+        self.assertEqual(ts.count(s=ghana), 3)
+        self.assertEqual(len(ts.triples()), 7)
+        self.assertIsNone(ts.term_id('Q1'))
+
+    def test_search_properties(self):
+        self.assertEqual(triplestore.search_properties('population')[0][0], 'P1082')
+        self.assertEqual(triplestore.search_properties('temperature'), [])
+
+    def test_find_property_values(self):
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'ghana', tt.PROPERTY: 'P36',
+                         tt.OBJECT: '?x', tt.OPVAR: '?x', tt.COST: 1})
+        facts = triplestore.find_property_values(alist, tt.OBJECT)
+        self.assertEqual([f.get(tt.OBJECT) for f in facts], ['Accra'])
+        self.assertEqual(facts[0].data_sources, ['wikidata'])
+
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: '?x', tt.PROPERTY: 'P36',
+                         tt.OBJECT: 'Accra', tt.OPVAR: '?x', tt.COST: 1})
+        facts = triplestore.find_property_values(alist, tt.SUBJECT)
+        self.assertEqual([f.get(tt.SUBJECT) for f in facts], ['Ghana'])
+
+    def test_explicit_time(self):
+        # truthy claims have no dates to answer for a given year
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'P1082',
+                         tt.OBJECT: '?x', tt.TIME: '2010', tt.OPVAR: '?x', tt.COST: 1})
+        self.assertEqual(triplestore.find_property_values(alist, tt.OBJECT), [])
+        alist.set(tt.TIME, '')
+        facts = triplestore.find_property_values(alist, tt.OBJECT)
+        self.assertEqual([f.get(tt.OBJECT) for f in facts], ['31072940'])
+
+    def test_search_kb(self):
+        # answered from the local store without searching the remote sources
+        G = InferenceGraph()
+        infer = Infer(G)
+        alist = Alist(**{tt.ID: '1', tt.SUBJECT: 'Ghana', tt.PROPERTY: 'capital',
+                         tt.OBJECT: '?x', tt.OPVAR: '?x', tt.COST: 1})
+        G.add_alist(alist)
+        prior = SimpleNamespace(get_prior=lambda source: SimpleNamespace(cov=0.1))
+        with mock.patch('frank.infer.sourcePrior', return_value=prior):
+            self.assertTrue(infer.search_kb(alist))
+        self.assertEqual(infer.kb_calls, 0)
+        facts = G.child_alists(alist.id)
+        self.assertEqual([f.get(tt.OBJECT) for f in facts], ['Accra'])
+
+
+if __name__ == '__main__':
+    unittest.main()
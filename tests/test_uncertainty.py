@@ -1,5 +1,12 @@
+import os
+import time
+import tempfile
 import unittest
+from unittest import mock
 import json
+import pandas as pd
+import frank.dataloader
+import frank.uncertainty.priorStore as priorStore
 import frank.uncertainty.sourcePrior as sourcePrior
 import frank.uncertainty.propertyPrior as propertyPrior
 import frank.uncertainty.aggregateUncertainty as aggregateUncertainty
@@ -93,5 +100,59 @@ class TestUncertainty(unittest.TestCase):
     #     self.assertTrue(confidence > 0, "confidence value must be positive")
 
 
+class TestPriorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_path = frank.dataloader.data_path
+        frank.dataloader.data_path = lambda filename: os.path.join(self.tmp.name, filename)
+        frank.dataloader.invalidate()
+        pd.DataFrame({'source': ['worldbank'], 'paramA': [1.0], 'paramB': [1.0],
+                      'cov': [0.1], 'lastModified': [None]}).to_pickle(
+            os.path.join(self.tmp.name, 'source_priors.pickle'))
+        self.store = priorStore.PriorStore('source_priors', 'sourcepriors', ['source'])
+
+    def tearDown(self):
+        self.store.reset()
+        frank.dataloader.data_path = self.data_path
+        frank.dataloader.invalidate()
+        self.tmp.cleanup()
+
+    def test_write_behind(self):
+        self.assertEqual(self.store.get(('worldbank',))['cov'], 0.1)
+        self.store.update_posteriors([
+            {'source': 'worldbank', 'cov': 0.2},
+            {'source': 'wikidata', 'paramA': 1.0, 'paramB': 1.0, 'cov': 0.5}])
+        self.assertEqual(self.store.get(('worldbank',))['cov'], 0.2)
+        self.assertEqual(self.store.dirty, set([('worldbank',), ('wikidata',)]))
+        # not written until flushed
+        frank.dataloader.invalidate()
+        self.assertEqual(len(frank.dataloader.load_source_priors()), 1)
+
+        self.store.flush()
+        self.assertEqual(self.store.dirty, set())
+        frank.dataloader.invalidate()
+        df = frank.dataloader.load_source_priors()
+        self.assertEqual(sorted(df.source), ['wikidata', 'worldbank'])
+        self.assertEqual(df.loc[df.source == 'worldbank', 'cov'].iloc[0], 0.2)
+
+
+    def test_invalidate_on_change(self):
+        self.store.get(('worldbank',))
+        with mock.patch('frank.cache.answers.invalidate') as invalidate:
+            self.store.put({'source': 'worldbank', 'cov': 0.1, 'lastModified': 1})
+            self.store.put({'source': 'wikidata', 'cov': 0.9}, invalidate=False)
+            self.assertEqual(invalidate.call_count, 0)
+            self.store.put({'source': 'worldbank', 'cov': 0.2})
+            self.assertEqual(invalidate.call_count, 1)
+
+
+    def test_retry_failed_flush(self):
+        self.store.put({'source': 'worldbank', 'cov': 0.2})
+        with mock.patch('frank.dataloader.update_data', side_effect=OSError('disk full')):
+            self.store.flush()
+        self.assertEqual(self.store.dirty, set([('worldbank',)]))
+        self.assertIsNotNone(self.store.timer)
+
+
 if __name__ == "__main__":
     unittest.main()
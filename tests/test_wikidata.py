@@ -1,5 +1,8 @@
 import unittest
+from types import SimpleNamespace
+from unittest import mock
 from frank.kb import wikidata
+from frank.kb.utils.cache import TTLStore
 from frank.alist import Alist
 from frank.alist import Attributes as tt
 from frank.alist import Contexts as ctx
@@ -136,5 +139,46 @@ class TestWikidata(unittest.TestCase):
         prop = wikidata.search_properties("singing")
         self.assertTrue(len(prop) > 0)
 
+class TestWikidataCache(unittest.TestCase):
+
+    def test_entity_cache(self):
+        calls = []
+        def resolve_entity(entity_name, property_id):
+            calls.append(entity_name)
+            return 'Q117' if entity_name == 'Ghana' else ''
+        with mock.patch.object(wikidata, 'entity_cache', TTLStore('test', ttl=60, disk=False)), \
+                mock.patch.object(wikidata, 'resolve_entity', side_effect=resolve_entity):
+            for _ in range(2):
+                self.assertEqual(wikidata.find_entity('Ghana', 'P1082'), 'Q117')
+                self.assertEqual(wikidata.find_entity('Wakanda', 'P1082'), '')
+        self.assertEqual(calls, ['Ghana', 'Wakanda'])
+
+    def test_property_domain_cache(self):
+        data = {'results': {'bindings': [{'oLabel': {'value': 'country'}}]}}
+        get = mock.Mock(return_value=SimpleNamespace(json=lambda: data))
+        with mock.patch.object(wikidata, 'domain_cache', TTLStore('test', ttl=60, disk=False)), \
+                mock.patch.object(wikidata.requests, 'get', get):
+            for _ in range(2):
+                self.assertEqual(wikidata.find_property_domain('P1082'), ['country'])
+        self.assertEqual(get.call_count, 1)
+
+    def test_resolve_entity_single_query(self):
+        queries = []
+        def get(url, params=None, **kwargs):
+            if 'sparql' not in url:
+                data = {'search': [{'id': 'Q1'}, {'id': 'Q117'}, {'id': 'Q2'}]}
+            else:
+                queries.append(params['query'])
+                data = {'results': {'bindings': [
+                    {'item': {'value': 'http://www.wikidata.org/entity/Q2'}},
+                    {'item': {'value': 'http://www.wikidata.org/entity/Q117'}}]}}
+            return SimpleNamespace(json=lambda: data)
+        with mock.patch.object(wikidata, 'find_property_domain', return_value=['country']), \
+                mock.patch.object(wikidata.requests, 'get', side_effect=get):
+            self.assertEqual(wikidata.resolve_entity('Ghana', 'P1082'), 'Q117')
+        self.assertEqual(len(queries), 1)
+        self.assertIn('wd:Q1 wd:Q117 wd:Q2', queries[0])
+
+
 if __name__ == '__main__':
     unittest.main()
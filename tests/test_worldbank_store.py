@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from frank import config
+from frank.kb import worldbank_store
+
+CSV = '''"Data Source","World Development Indicators",
+
+"Last Updated Date","2020-12-16",
+
+"Country Name","Country Code","Indicator Name","Indicator Code","2009","2010","2011",
+"Ghana","GHA","Population, total","SP.POP.TOTL","23691533","24262901","24848827",
+"Eritrea","ERI","Population, total","SP.POP.TOTL","","3170437","",
+'''
+
+
+class TestWorldbankStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = config.config['worldbank_store']
+        config.config['worldbank_store'] = os.path.join(self.tmp.name, 'worldbank.sqlite')
+        csv_path = os.path.join(self.tmp.name, 'API_SP.POP.TOTL.csv')
+        with open(csv_path, 'w') as f:
+            f.write(CSV)
+        self.count = worldbank_store.ingest([csv_path])
+
+    def tearDown(self):
+        config.config['worldbank_store'] = self.store
+        self.tmp.cleanup()
+
+    def test_ingest(self):
+        self.assertEqual(self.count, 4)
+
+    def test_find_values(self):
+        self.assertEqual(worldbank_store.find_values('GHA', 'SP.POP.TOTL', '2010'),
+                         [['2010', 24262901.0]])
+        self.assertEqual([x[0] for x in worldbank_store.find_values('GHA', 'SP.POP.TOTL')],
+                         ['2011', '2010', '2009'])
+        self.assertEqual(worldbank_store.find_values('ERI', 'SP.POP.TOTL', '2011'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()